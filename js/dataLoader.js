@@ -79,6 +79,15 @@ async function loadUserProfile(userId) {
     }
 }
 
+/**
+ * Numeric stat of a master database record: numbers in canonical units since the
+ * typed stats migration, strings in older databases, fallback when empty
+ */
+function statNumber(value, fallback = null) {
+    if (typeof value === 'number') return value;
+    return value ? parseFloat(value) : fallback;
+}
+
 /**
  * Get coaster data by ID from master database
  */
@@ -120,10 +129,10 @@ function getUserCoasters(userId) {
             material_type: masterData.type,
             coaster_build: masterData.design,
             coaster_model: masterData.model,
-            max_speed_kmh: masterData.speed ? parseFloat(masterData.speed) : null,
-            track_height_m: masterData.height ? parseFloat(masterData.height) : null,
-            track_length_m: masterData.length ? parseFloat(masterData.length) : null,
-            inversions: masterData.inversions ? parseInt(masterData.inversions) : 0,
+            max_speed_kmh: statNumber(masterData.speed),
+            track_height_m: statNumber(masterData.height),
+            track_length_m: statNumber(masterData.length),
+            inversions: statNumber(masterData.inversions, 0),
             operatief: (typeof masterData.status === 'object' ? masterData.status.state === 'operating' : masterData.status === 'Operating') ? 1 : 0,
             // Additional fields
             duration: masterData.duration,
@@ -0,0 +1,212 @@
+"""
+Database Backup Store
+Keeps backups of coasters_master.json and the mapping as periodic full snapshots plus
+gzipped deltas (changed records only) in between, with a retention policy.
+Run it to list backups or restore the database as it was at a given time.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from coaster_record import json_default
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Formats accepted by restore --at
+_AT_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%Y%m%d_%H%M%S')
+
+
+def record_hash(record: Dict) -> str:
+    text = json.dumps(record, sort_keys=True, ensure_ascii=False, default=json_default)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def parse_time(value: str) -> datetime:
+    for time_format in _AT_FORMATS:
+        try:
+            return datetime.strptime(value, time_format)
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognised time '{value}' (use e.g. '2025-01-31 18:00:00')")
+
+
+class BackupStore:
+    """
+    Chains of one full snapshot followed by deltas
+
+    A delta holds the records and mapping entries that differ from the previous
+    backup (None for removed ones), found by comparing record hashes with the
+    last backed-up state kept in head.json.gz. A new chain starts every
+    full_every backups, or when a delta would be bigger than half the database.
+    Only the newest keep_chains chains are kept.
+    """
+
+    def __init__(self, backup_dir: Union[str, Path], full_every: int = 24, keep_chains: int = 4):
+        self.backup_dir = Path(backup_dir)
+        self.full_every = full_every
+        self.keep_chains = keep_chains
+        self.manifest_path = self.backup_dir / "manifest.json"
+        self.head_path = self.backup_dir / "head.json.gz"
+        self.backups: List[Dict] = []  # {file, kind, time, records}, oldest first
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.backups = json.load(f)['backups']
+
+    def _read(self, name: str) -> Dict:
+        with gzip.open(self.backup_dir / name, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write(self, path: Path, data: Dict):
+        tmp_path = path.with_name(path.name + '.tmp')
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'), default=json_default)
+        os.replace(tmp_path, path)
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'backups': self.backups}, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def backup(self, database: Dict[str, Dict], mapping: Dict[str, str]) -> Optional[Path]:
+        """Back up the current state; returns the file written (None if nothing changed)"""
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        now = datetime.now()
+        hashes = {custom_id: record_hash(record) for custom_id, record in database.items()}
+
+        head = self._read(self.head_path.name) if self.backups and self.head_path.exists() else None
+        kind = 'full'
+        data: Dict = {'database': database, 'mapping': mapping}
+        if head is not None and self._since_last_full() < self.full_every:
+            old_hashes, old_mapping = head['records'], head['mapping']
+            records = {custom_id: database[custom_id] for custom_id, digest in hashes.items()
+                       if old_hashes.get(custom_id) != digest}
+            records.update({custom_id: None for custom_id in old_hashes if custom_id not in database})
+            entries = {rcdb_id: custom_id for rcdb_id, custom_id in mapping.items()
+                       if old_mapping.get(rcdb_id) != custom_id}
+            entries.update({rcdb_id: None for rcdb_id in old_mapping if rcdb_id not in mapping})
+            if not records and not entries:
+                print("✓ Backup skipped: nothing changed since the last one")
+                return None
+            if len(records) <= len(database) // 2:
+                kind = 'delta'
+                data = {'records': records, 'mapping': entries}
+
+        name = f"{kind}_{now.strftime('%Y%m%d_%H%M%S_%f')}.json.gz"
+        self._write(self.backup_dir / name, data)
+        self._write(self.head_path, {'records': hashes, 'mapping': mapping})
+        self.backups.append({
+            'file': name,
+            'kind': kind,
+            'time': now.strftime(TIMESTAMP_FORMAT),
+            'records': len(data['database'] if kind == 'full' else data['records']),
+        })
+        self._apply_retention()
+        self._save_manifest()
+        return self.backup_dir / name
+
+    def _since_last_full(self) -> int:
+        for count, entry in enumerate(reversed(self.backups)):
+            if entry['kind'] == 'full':
+                return count
+        return self.full_every
+
+    def _apply_retention(self):
+        full_indexes = [i for i, entry in enumerate(self.backups) if entry['kind'] == 'full']
+        if len(full_indexes) <= self.keep_chains:
+            return
+        cut = full_indexes[-self.keep_chains]
+        for entry in self.backups[:cut]:
+            (self.backup_dir / entry['file']).unlink(missing_ok=True)
+        self.backups = self.backups[cut:]
+
+    def restore(self, at: datetime) -> Tuple[Dict[str, Dict], Dict[str, str], Dict]:
+        """(database, mapping, backup entry) of the last backup taken at or before `at`"""
+        chosen = None
+        for i, entry in enumerate(self.backups):
+            if datetime.strptime(entry['time'], TIMESTAMP_FORMAT) <= at:
+                chosen = i
+        if chosen is None:
+            raise ValueError(f"No backup at or before {at.strftime(TIMESTAMP_FORMAT)}")
+
+        start = max(i for i in range(chosen + 1) if self.backups[i]['kind'] == 'full')
+        full = self._read(self.backups[start]['file'])
+        database, mapping = full['database'], full['mapping']
+        for entry in self.backups[start + 1:chosen + 1]:
+            delta = self._read(entry['file'])
+            for custom_id, record in delta['records'].items():
+                if record is None:
+                    database.pop(custom_id, None)
+                else:
+                    database[custom_id] = record
+            for rcdb_id, custom_id in delta['mapping'].items():
+                if custom_id is None:
+                    mapping.pop(rcdb_id, None)
+                else:
+                    mapping[rcdb_id] = custom_id
+        return database, mapping, self.backups[chosen]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="List database backups or restore one",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Show every backup
+  python backup_store.py list
+
+  # Put the database back as it was at 18:00 yesterday
+  python backup_store.py restore --at "2025-01-31 18:00:00"
+        """
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='List backups')
+    restore_parser = subparsers.add_parser('restore', help='Restore the database as it was at a given time')
+    restore_parser.add_argument('--at', required=True,
+                                help='Time to restore, e.g. "2025-01-31 18:00:00" (last backup at or before it)')
+    restore_parser.add_argument('--preview', action='store_true',
+                                help='Only show which backup would be restored')
+    args = parser.parse_args()
+
+    # Imported here: the merger itself uses this module for its backups
+    from database_merger_simple import DatabaseMerger
+
+    database_dir = Path(__file__).parent.parent.parent / "database" / "data"
+    store = BackupStore(database_dir / "backups")
+
+    if args.command == 'list':
+        for entry in store.backups:
+            print(f"{entry['time']}  {entry['kind']:<5}  {entry['records']:>6} records  {entry['file']}")
+        print(f"✓ {len(store.backups)} backups in {store.backup_dir}")
+        return
+
+    try:
+        at = parse_time(args.at)
+        database, mapping, entry = store.restore(at)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"✓ Backup of {entry['time']}: {len(database)} coasters, {len(mapping)} mappings")
+    if args.preview:
+        print("⚠️  PREVIEW MODE - No changes were saved")
+        return
+
+    # The current state is backed up first, so a restore can itself be undone
+    merger = DatabaseMerger(str(database_dir / "coasters_master.json"),
+                            str(database_dir / "rcdb_to_custom_mapping.json"))
+    store.backup(merger.database, merger.mapping)
+    merger.mark_dirty(set(merger.database) | set(database), set(merger.mapping) | set(mapping))
+    merger.database, merger.mapping = database, mapping
+    merger.save(backup=False)
+    merger.close()
+    print(f"✓ Restored database to {entry['time']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+RCDB Parser Micro-Benchmark
+Times stats extraction on saved RCDB pages: the old one-regex-pass-per-stat
+approach versus the single-scan rcdb_page.extract_stats.
+With --backends, also checks that the 'soup' and 'tokenizer' page parsers give
+identical results on every page and times both. Without a directory the fixture
+pages of test_parser_backends.py are used.
+"""
+
+import argparse
+import html as html_lib
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from rcdb_page import extract_stats
+from rcdb_scraper import RCDBScraper
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "rcdb_pages"
+
+
+def legacy_stats(html: str) -> Dict[str, str]:
+    """The previous RCDBScraper extraction: up to two full-page regex searches per stat"""
+    def stat(name: str) -> str:
+        match = re.search(rf'<th>{name}<td><span class=float>([^<]+)</span>', html, re.IGNORECASE)
+        if match:
+            return match.group(1)
+        match = re.search(rf'<th>{name}<td>(\d+)', html, re.IGNORECASE)
+        return match.group(1) if match else ""
+
+    duration = re.search(r'<th>Duration<td>(\d+:\d+)', html, re.IGNORECASE)
+    elements = re.search(r'<th>Elements<td>(.*?)(?:<tr>|</td>)', html, re.IGNORECASE | re.DOTALL)
+    return {
+        "height": stat("Height"),
+        "drop": stat("Drop"),
+        "angle": stat("Angle"),
+        "verticalAngle": stat("Vertical Angle"),
+        "speed": stat("Speed"),
+        "length": stat("Length"),
+        "inversions": stat("Inversions"),
+        "duration": duration.group(1) if duration else "",
+        "elements": [
+            (int(element_id), html_lib.unescape(name).strip())
+            for element_id, name in re.findall(r'/g\.htm\?id=(\d+)[^>]*>([^<]+)</a>', elements.group(1))
+        ] if elements else [],
+    }
+
+
+def time_per_page(extract: Callable[[str], Dict], pages: List[str], rounds: int) -> float:
+    """Best-of-rounds average seconds per page"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for html in pages:
+            extract(html)
+        best = min(best, time.perf_counter() - start)
+    return best / len(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RCDB stats extraction on saved pages")
+    parser.add_argument('pages_dir', nargs='?', default=str(FIXTURES_DIR),
+                        help='Directory with saved RCDB pages (*.htm / *.html, default: the fixture pages)')
+    parser.add_argument('--rounds', type=int, default=5, help='Timing rounds, best is reported (default: 5)')
+    parser.add_argument('--backends', action='store_true',
+                        help='Also compare and time the soup and tokenizer page parsers')
+    args = parser.parse_args()
+
+    paths = sorted(p for p in Path(args.pages_dir).iterdir() if p.suffix in ('.htm', '.html'))
+    if not paths:
+        parser.error(f"No .htm/.html files in {args.pages_dir}")
+    pages = [p.read_text(encoding='utf-8', errors='replace') for p in paths]
+
+    # Both extractors must agree on the fields they share
+    mismatches = 0
+    for path, html in zip(paths, pages):
+        new = extract_stats(html)
+        for field_name, value in legacy_stats(html).items():
+            if new[field_name] != value:
+                mismatches += 1
+                print(f"⚠️  {path.name}: {field_name} legacy={value!r} new={new[field_name]!r}")
+
+    legacy = time_per_page(legacy_stats, pages, args.rounds)
+    single = time_per_page(extract_stats, pages, args.rounds)
+
+    print("=" * 70)
+    print(f"Pages: {len(pages)}  (avg {sum(map(len, pages)) / len(pages) / 1024:.1f} KB)")
+    print(f"Legacy per-stat regex: {legacy * 1e6:8.1f} µs/page")
+    print(f"Single-scan table:     {single * 1e6:8.1f} µs/page")
+    print(f"Speed-up:              {legacy / single:8.1f}x")
+    print(f"Mismatches:            {mismatches}")
+    print("=" * 70)
+
+    if args.backends:
+        compare_backends(paths, pages, args.rounds)
+
+
+def compare_backends(paths: List[Path], pages: List[str], rounds: int):
+    """Full parse_page with every parser backend: outputs must be identical"""
+    scrapers = {name: RCDBScraper(delay=0, parser=name) for name in RCDBScraper.PARSERS}
+    reference = 'soup'
+
+    differences = 0
+    for path, html in zip(paths, pages):
+        expected = scrapers[reference].parse_page(html, 0)
+        for name, scraper in scrapers.items():
+            if name != reference and scraper.parse_page(html, 0) != expected:
+                differences += 1
+                print(f"⚠️  {path.name}: '{name}' differs from '{reference}'")
+
+    print()
+    print("Page parsers (full parse_page):")
+    for name, scraper in scrapers.items():
+        seconds = time_per_page(lambda html: scraper.parse_page(html, 0), pages, rounds)
+        print(f"  {name:<10} {seconds * 1e6:10.1f} µs/page")
+    print(f"  Pages with differences: {differences}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Compact Coaster Record
+Memory-light stand-in for a coaster dict: one slot per known field, key order shared
+between records, repeated categorical values (country, status, ...) interned.
+Reads and writes like a dict, so DatabaseMerger and the scripts need no changes.
+"""
+
+import sys
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Fields stored in slots; anything else goes to a small per-record dict
+FIELDS = (
+    'id', 'name', 'rcdbId', 'parkName', 'rcdbParkId', 'city', 'country', 'status', 'opened',
+    'manufacturer', 'model', 'type', 'design',
+    'height', 'drop', 'angle', 'verticalAngle', 'speed', 'length', 'inversions', 'duration',
+    'elements', 'extraStats', 'parserVersion', 'sourceUnits', 'lastScraped', 'lastChanged',
+    'isSplitTrack', 'splitGroup', 'trackName', 'splitSiblings',
+)
+_FIELD_SET = frozenset(FIELDS)
+
+# String values shared by many records, stored once
+CATEGORICAL_FIELDS = frozenset({
+    'parkName', 'city', 'country', 'status', 'manufacturer', 'model', 'type', 'design',
+    'sourceUnits', 'lastScraped', 'lastChanged',
+})
+
+# Key orders seen so far: every record with the same fields in the same order
+# points at one tuple (and one frozenset for membership tests)
+_shapes: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+_shape_sets: Dict[Tuple[str, ...], frozenset] = {}
+
+
+def _shape(keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    shape = _shapes.get(keys)
+    if shape is None:
+        shape = _shapes[keys] = keys
+        _shape_sets[keys] = frozenset(keys)
+    return shape
+
+
+class CoasterRecord(MutableMapping):
+    """
+    A coaster record with dict behaviour (get, [], in, items, pop, update, ==)
+
+    Known fields are also plain attributes (record.status), which hot loops can
+    read without a dict lookup; an attribute of a field the record lacks raises
+    AttributeError. Iteration follows insertion order, like a dict, so records
+    serialize exactly as the dicts they were built from (see to_dict and
+    json_default).
+    """
+
+    __slots__ = ('_keys', '_extra') + FIELDS
+
+    def __init__(self, data: Optional[Dict] = None):
+        extra = None
+        if data:
+            for key, value in data.items():
+                if key in _FIELD_SET:
+                    if key in CATEGORICAL_FIELDS and type(value) is str:
+                        value = sys.intern(value)
+                    object.__setattr__(self, key, value)
+                else:
+                    if extra is None:
+                        extra = {}
+                    extra[key] = value
+        object.__setattr__(self, '_keys', _shape(tuple(data) if data else ()))
+        object.__setattr__(self, '_extra', extra)
+
+    def __getitem__(self, key: str):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key: str, value):
+        if key not in _shape_sets[self._keys]:
+            self._keys = _shape(self._keys + (key,))
+        if key in _FIELD_SET:
+            if key in CATEGORICAL_FIELDS and type(value) is str:
+                value = sys.intern(value)
+            object.__setattr__(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key not in _shape_sets[self._keys]:
+            raise KeyError(key)
+        self._keys = _shape(tuple(k for k in self._keys if k != key))
+        if key in _FIELD_SET:
+            object.__delattr__(self, key)
+        else:
+            del self._extra[key]
+            if not self._extra:
+                self._extra = None
+
+    def __setattr__(self, name: str, value):
+        # Field attributes go through __setitem__, so the key order stays right
+        if name in _FIELD_SET:
+            self[name] = value
+        else:
+            object.__setattr__(self, name, value)
+
+    def __contains__(self, key) -> bool:
+        return key in _shape_sets[self._keys]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"CoasterRecord({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict:
+        return {key: self[key] for key in self._keys}
+
+    def copy(self) -> 'CoasterRecord':
+        return CoasterRecord(self)
+
+    def __reduce__(self):
+        # Pickled as key order + values, not as slots
+        return _from_items, (self._keys, tuple(self[key] for key in self._keys))
+
+
+def _from_items(keys: Tuple[str, ...], values: Tuple) -> CoasterRecord:
+    return CoasterRecord(dict(zip(keys, values)))
+
+
+def pack_database(database: Dict[str, Dict]) -> Tuple[List[Tuple[str, ...]], List[Tuple[str, int, Tuple]]]:
+    """
+    (key orders, [(custom ID, key order index, values)]) - plain tuples, so the
+    database can be marshalled; unpack_database turns it back into records
+    """
+    shape_index: Dict[Tuple[str, ...], int] = {}
+    rows = []
+    for custom_id, record in database.items():
+        keys = tuple(record)
+        index = shape_index.setdefault(keys, len(shape_index))
+        rows.append((custom_id, index, tuple(record[key] for key in keys)))
+    return list(shape_index), rows
+
+
+def unpack_database(packed: Tuple[List[Tuple[str, ...]], List[Tuple[str, int, Tuple]]]) -> Dict[str, CoasterRecord]:
+    """Records from pack_database output, set straight into their slots"""
+    shapes, rows = packed
+    set_keys = CoasterRecord._keys.__set__
+    set_extra = CoasterRecord._extra.__set__
+    plans = []
+    for keys in shapes:
+        shape = _shape(tuple(keys))
+        slots = [(i, getattr(CoasterRecord, key).__set__) for i, key in enumerate(shape) if key in _FIELD_SET]
+        extras = [(i, key) for i, key in enumerate(shape) if key not in _FIELD_SET]
+        plans.append((shape, slots, extras))
+
+    database = {}
+    new_record = CoasterRecord.__new__
+    for custom_id, index, values in rows:
+        shape, slots, extras = plans[index]
+        record = new_record(CoasterRecord)
+        for i, set_slot in slots:
+            set_slot(record, values[i])
+        set_keys(record, shape)
+        set_extra(record, {key: values[i] for i, key in extras} if extras else None)
+        database[custom_id] = record
+    return database
+
+
+def json_default(value):
+    """json.dump(..., default=json_default) writes records (and lazy record mappings) as the dicts they stand for"""
+    if isinstance(value, CoasterRecord):
+        return value.to_dict()
+    if isinstance(value, Mapping):
+        return dict(value.items())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def compact_database(database: Dict[str, Dict]) -> Dict[str, CoasterRecord]:
+    """The same database with every record as a CoasterRecord (in place, keeps the order)"""
+    for custom_id, record in database.items():
+        if not isinstance(record, CoasterRecord):
+            database[custom_id] = CoasterRecord(record)
+    return database
@@ -0,0 +1,122 @@
+"""
+Database Journal
+Append-only JSONL log of changed coaster records and mapping entries. DatabaseMerger
+replays it on top of coasters_master.json when loading and folds it into a new
+snapshot when compacting, so a save only writes what changed.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from coaster_record import json_default
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class DatabaseJournal:
+    """
+    One JSON object per line:
+      {"id": custom_id, "record": {...}}   record added or changed (null: removed)
+      {"rcdbId": rcdb_id, "id": custom_id}  mapping entry set (null: removed)
+      {"commit": timestamp, "changed": n, ...}  end of one save
+
+    "changed" counts the records whose data changed; the rest only had
+    lastScraped moved. Lines after the last commit marker belong to a save that was interrupted
+    and are ignored, so a crash never leaves half a batch applied.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.pending_changes = 0  # Changed records in committed saves not yet in a snapshot
+
+    def size(self) -> int:
+        """Bytes on disk (0 if there is no journal)"""
+        return self.path.stat().st_size if self.path.exists() else 0
+
+    def append(self, records: Dict[str, Optional[Dict]], mapping: Dict[str, Optional[str]],
+               changed: Optional[int] = None):
+        """
+        Append one save: the given records and mapping entries, then a commit marker
+
+        changed is how many of the records (plus mapping entries) hold real
+        changes; by default all of them.
+        """
+        if changed is None:
+            changed = len(records) + len(mapping)
+        lines = [json.dumps({'id': custom_id, 'record': record}, ensure_ascii=False, default=json_default)
+                 for custom_id, record in records.items()]
+        lines += [json.dumps({'rcdbId': rcdb_id, 'id': custom_id})
+                  for rcdb_id, custom_id in mapping.items()]
+        lines.append(json.dumps({
+            'commit': datetime.now().strftime(TIMESTAMP_FORMAT),
+            'records': len(records),
+            'mappings': len(mapping),
+            'changed': changed,
+        }))
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending_changes += changed
+
+    def replay(self, database: Dict[str, Dict], mapping: Dict[str, str], repair: bool = False) -> int:
+        """
+        Apply every committed save to database and mapping in place; returns the number of saves
+
+        A save that is not committed yet (interrupted, or still being written by
+        another process) is skipped. With repair=True, for the process that
+        writes the journal, it is also cut off the file.
+        """
+        if not self.path.exists():
+            return 0
+        commits = 0
+        committed_bytes = 0  # End of the last commit marker
+        offset = 0
+        records: Dict[str, Optional[Dict]] = {}
+        entries: Dict[str, Optional[str]] = {}
+        with open(self.path, 'rb') as f:
+            for line in f:
+                offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # Torn write at the end of an interrupted save
+                if 'commit' in entry:
+                    self._apply(records, entries, database, mapping)
+                    records, entries = {}, {}
+                    commits += 1
+                    committed_bytes = offset
+                    self.pending_changes += entry.get('changed', entry.get('records', 0) + entry.get('mappings', 0))
+                elif 'rcdbId' in entry:
+                    entries[str(entry['rcdbId'])] = entry['id']
+                else:
+                    records[entry['id']] = entry['record']
+
+        # Cut off an interrupted save, so later saves are not appended behind it
+        if repair and committed_bytes < self.size():
+            with open(self.path, 'r+b') as f:
+                f.truncate(committed_bytes)
+        return commits
+
+    @staticmethod
+    def _apply(records: Dict[str, Optional[Dict]], entries: Dict[str, Optional[str]],
+               database: Dict[str, Dict], mapping: Dict[str, str]):
+        for custom_id, record in records.items():
+            if record is None:
+                database.pop(custom_id, None)
+            else:
+                database[custom_id] = record
+        for rcdb_id, custom_id in entries.items():
+            if custom_id is None:
+                mapping.pop(rcdb_id, None)
+            else:
+                mapping[rcdb_id] = custom_id
+
+    def clear(self):
+        """Drop the journal once its saves are part of a snapshot"""
+        if self.path.exists():
+            self.path.unlink()
+        self.pending_changes = 0
@@ -2,39 +2,437 @@
 Simple Database Merger
 Merges scraped RCDB data with existing database using rcdb_to_custom_mapping.json
 Preserves your existing split coasters and custom IDs
+Stored in coasters_master.json (default) or coasters_master.sqlite, from which
+the JSON files are exported
 """
 
+import argparse
 import json
-import shutil
+import os
+import sqlite3
+from collections.abc import MutableMapping
 from pathlib import Path
-from typing import Dict, List, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 from datetime import datetime
+from backup_store import BackupStore
+from coaster_record import CoasterRecord, compact_database, json_default
+from database_journal import DatabaseJournal
+from element_index import ElementIndex
+from id_allocator import IdAllocator
+from park_resolver import ParkResolver, park_id_of
+from snapshot_cache import load_database, load_json, write_snapshot
+
+# Format of the lastScraped / lastChanged record fields (see refresh_scheduler)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class SqliteStorage:
+    """
+    Coasters, mapping, parks and countries tables in one SQLite file
+    
+    Every record is kept as JSON next to indexed rcdbId, status, country and
+    parkId columns, so scripts can select records without loading them all
+    (see query, and SqliteRecords for the merger). Rows keep their insertion
+    order (rowid), which is the order of the JSON export. The file is in WAL
+    mode and every write is one transaction.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS coasters (
+            seq INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            rcdb_id INTEGER,
+            status TEXT,
+            country TEXT,
+            park_id TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS coasters_rcdb_id ON coasters (rcdb_id);
+        CREATE INDEX IF NOT EXISTS coasters_status ON coasters (status);
+        CREATE INDEX IF NOT EXISTS coasters_country ON coasters (country);
+        CREATE INDEX IF NOT EXISTS coasters_park_id ON coasters (park_id);
+        CREATE TABLE IF NOT EXISTS mapping (
+            seq INTEGER PRIMARY KEY,
+            rcdb_id TEXT NOT NULL UNIQUE,
+            id TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS parks (
+            park_id TEXT PRIMARY KEY,
+            country_code TEXT,
+            name TEXT,
+            rcdb_park_id INTEGER,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS parks_country_code ON parks (country_code);
+        CREATE TABLE IF NOT EXISTS countries (
+            name TEXT PRIMARY KEY,
+            code TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+    
+    # Filters accepted by query()
+    QUERY_COLUMNS = {'rcdb_id': 'rcdb_id', 'status': 'status', 'country': 'country', 'park_id': 'park_id'}
+    
+    # Records per SELECT ... WHERE id IN (...), below SQLite's parameter limit
+    FETCH_CHUNK = 500
+    
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(self.SCHEMA)
+    
+    def is_empty(self) -> bool:
+        return self.connection.execute("SELECT 1 FROM coasters LIMIT 1").fetchone() is None
+    
+    @staticmethod
+    def column_value(value):
+        """
+        A record field as a column value: object statuses ({'state': ...}) by
+        their state, other non-scalar values as JSON
+        """
+        if isinstance(value, dict) and 'state' in value:
+            value = value['state']
+        if value is None or isinstance(value, (str, int, float)):
+            return value
+        return json.dumps(value, ensure_ascii=False, default=json_default)
+    
+    def index(self) -> List[Tuple[str, Optional[int]]]:
+        """(custom ID, rcdbId) of every record, in insertion order (no record data is read)"""
+        return self.connection.execute("SELECT id, rcdb_id FROM coasters ORDER BY seq").fetchall()
+    
+    def load_mapping(self) -> Dict[str, str]:
+        return dict(self.connection.execute("SELECT rcdb_id, id FROM mapping ORDER BY seq"))
+    
+    def fetch(self, custom_ids: Sequence[str]) -> Dict[str, CoasterRecord]:
+        """The records with these custom IDs (missing ones are left out)"""
+        records = {}
+        for start in range(0, len(custom_ids), self.FETCH_CHUNK):
+            chunk = custom_ids[start:start + self.FETCH_CHUNK]
+            rows = self.connection.execute(
+                f"SELECT id, data FROM coasters WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            records.update((custom_id, CoasterRecord(json.loads(data))) for custom_id, data in rows)
+        return records
+    
+    def query(self, fields: Optional[Sequence[str]] = None, **filters) -> Dict[str, Dict]:
+        """
+        Records matching every filter, e.g. query(status='SBNO', country='Germany')
+        
+        fields: Only read these fields of each record, e.g. ('rcdbId',
+            'lastScraped'), instead of parsing whole records; null and missing
+            fields are left out.
+        """
+        unknown = set(filters) - set(self.QUERY_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot filter on {', '.join(sorted(unknown))}")
+        where = ' AND '.join(f"{self.QUERY_COLUMNS[name]} = ?" for name in filters) or '1'
+        if fields is None:
+            rows = self.connection.execute(f"SELECT id, data FROM coasters WHERE {where} ORDER BY seq",
+                                           tuple(filters.values()))
+            return {custom_id: json.loads(data) for custom_id, data in rows}
+        
+        # json_quote keeps objects (e.g. status objects) as JSON, so every value decodes alike
+        columns = ', '.join('json_quote(json_extract(data, ?))' for _ in fields)
+        rows = self.connection.execute(f"SELECT id, {columns} FROM coasters WHERE {where} ORDER BY seq",
+                                       tuple(f'$.{field}' for field in fields) + tuple(filters.values()))
+        records = {}
+        for custom_id, *values in rows:
+            values = [json.loads(value) for value in values]
+            records[custom_id] = {field: value for field, value in zip(fields, values) if value is not None}
+        return records
+    
+    def write(self, database: Dict[str, Dict], mapping: Dict[str, str],
+              custom_ids: Iterable[str], rcdb_ids: Iterable[str], changed: bool = True):
+        """
+        Store the given records and mapping entries (deleting the ones that are gone)
+        in one transaction; changed marks the JSON export as out of date
+        """
+        records = [(custom_id, database.get(custom_id)) for custom_id in custom_ids]
+        entries = [(rcdb_id, mapping.get(rcdb_id)) for rcdb_id in rcdb_ids]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO coasters (id, rcdb_id, status, country, park_id, data) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET rcdb_id = excluded.rcdb_id, status = excluded.status, "
+                "country = excluded.country, park_id = excluded.park_id, data = excluded.data",
+                [(custom_id, int(record['rcdbId']) if record.get('rcdbId') else None,
+                  self.column_value(record.get('status')), self.column_value(record.get('country')),
+                  park_id_of(custom_id),
+                  json.dumps(record, ensure_ascii=False, default=json_default))
+                 for custom_id, record in records if record is not None]
+            )
+            self.connection.executemany("DELETE FROM coasters WHERE id = ?",
+                                        [(custom_id,) for custom_id, record in records if record is None])
+            self.connection.executemany(
+                "INSERT INTO mapping (rcdb_id, id) VALUES (?, ?) ON CONFLICT (rcdb_id) DO UPDATE SET id = excluded.id",
+                [(rcdb_id, custom_id) for rcdb_id, custom_id in entries if custom_id is not None]
+            )
+            self.connection.executemany("DELETE FROM mapping WHERE rcdb_id = ?",
+                                        [(rcdb_id,) for rcdb_id, custom_id in entries if custom_id is None])
+            if changed:
+                self._set_meta('export_pending', '1')
+    
+    def write_parks(self, parks: Dict[str, Dict], countries: Dict[str, Dict]):
+        """Replace the parks and countries tables"""
+        with self.connection:
+            self.connection.execute("DELETE FROM parks")
+            self.connection.executemany(
+                "INSERT INTO parks (park_id, country_code, name, rcdb_park_id, data) VALUES (?, ?, ?, ?, ?)",
+                [(park_id, self.column_value(park.get('countryCode')), self.column_value(park.get('name')),
+                  self.column_value(park.get('rcdbParkId')), json.dumps(park, ensure_ascii=False))
+                 for park_id, park in parks.items()]
+            )
+            self.connection.execute("DELETE FROM countries")
+            self.connection.executemany(
+                "INSERT INTO countries (name, code, data) VALUES (?, ?, ?)",
+                [(name, self.column_value(country.get('code')), json.dumps(country, ensure_ascii=False))
+                 for name, country in countries.items()]
+            )
+    
+    def export_pending(self) -> bool:
+        """True when the JSON files are older than the last change"""
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'export_pending'").fetchone()
+        return row is not None and row[0] == '1'
+    
+    def mark_exported(self):
+        with self.connection:
+            self._set_meta('export_pending', '0')
+    
+    def _set_meta(self, key: str, value: str):
+        self.connection.execute("INSERT INTO meta (key, value) VALUES (?, ?) "
+                                "ON CONFLICT (key) DO UPDATE SET value = excluded.value", (key, value))
+    
+    def close(self):
+        self.connection.close()
+
+
+class SqliteRecords(MutableMapping):
+    """
+    The coasters table as a dict of CoasterRecords, read on demand
+    
+    Only the custom IDs are read up front. A record is loaded (and kept) the
+    first time it is looked up, and all the missing ones at once when the
+    values are iterated (items/values, e.g. for an export). Changes stay in
+    memory until DatabaseMerger.save writes the dirty records.
+    """
+    
+    def __init__(self, store: SqliteStorage, custom_ids: Iterable[str]):
+        self.store = store
+        self._records: Dict[str, Optional[CoasterRecord]] = dict.fromkeys(custom_ids)  # None: not loaded yet
+    
+    def __getitem__(self, custom_id: str) -> CoasterRecord:
+        record = self._records[custom_id]
+        if record is None:
+            record = self._records[custom_id] = self.store.fetch([custom_id])[custom_id]
+        return record
+    
+    def __setitem__(self, custom_id: str, record: Dict):
+        self._records[custom_id] = record
+    
+    def __delitem__(self, custom_id: str):
+        del self._records[custom_id]
+    
+    def __contains__(self, custom_id) -> bool:
+        return custom_id in self._records
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._records)
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def load_all(self):
+        """Read every record not loaded yet"""
+        missing = [custom_id for custom_id, record in self._records.items() if record is None]
+        if missing:
+            self._records.update(self.store.fetch(missing))
+    
+    def items(self):
+        self.load_all()
+        return self._records.items()
+    
+    def values(self):
+        self.load_all()
+        return self._records.values()
+
+
+def query_coasters(database_path: Union[str, Path], fields: Optional[Sequence[str]] = None,
+                   **filters) -> Dict[str, Dict]:
+    """
+    Saved records matching every filter, for scripts that only read the database
+    
+    Reads coasters_master.sqlite when it exists (coasters_master.json may lag
+    behind it until the next export), else coasters_master.json plus its
+    journal. Filters and fields as in SqliteStorage.query, e.g.
+    query_coasters(path, status='SBNO') or query_coasters(path, fields=('rcdbId',)).
+    """
+    database_path = Path(database_path)
+    sqlite_path = database_path.with_suffix('.sqlite')
+    if sqlite_path.exists():
+        store = SqliteStorage(sqlite_path)
+        try:
+            return store.query(fields, **filters)
+        finally:
+            store.close()
+    
+    unknown = set(filters) - set(SqliteStorage.QUERY_COLUMNS)
+    if unknown:
+        raise ValueError(f"Cannot filter on {', '.join(sorted(unknown))}")
+    database = load_database(database_path)
+    DatabaseJournal(database_path.with_name(database_path.stem + ".journal.jsonl")).replay(database, {})
+    
+    def column(custom_id: str, record: Dict, name: str):
+        if name == 'rcdb_id':
+            return int(record['rcdbId']) if record.get('rcdbId') else None
+        if name == 'park_id':
+            return park_id_of(custom_id)
+        return SqliteStorage.column_value(record.get(name))
+    
+    records = {}
+    for custom_id, record in database.items():
+        if all(column(custom_id, record, name) == value for name, value in filters.items()):
+            records[custom_id] = record if fields is None else \
+                {field: record[field] for field in fields if record.get(field) is not None}
+    return records
 
 
 class DatabaseMerger:
     """Merges scraped data into existing database"""
     
-    def __init__(self, database_path: str, mapping_path: str):
+    def __init__(self, database_path: str, mapping_path: str, backend: Optional[str] = None):
+        """
+        Args:
+            backend: 'json' (coasters_master.json plus its journal) or 'sqlite'
+                (coasters_master.sqlite, imported from the JSON files on first use).
+                Default: sqlite if that file exists, else json.
+        """
         self.database_path = Path(database_path)
         self.mapping_path = Path(mapping_path)
-        self.database: Dict[str, Dict] = {}  # custom_id -> coaster data
+        sqlite_path = self.database_path.with_suffix('.sqlite')
+        if backend is None:
+            backend = 'sqlite' if sqlite_path.exists() else 'json'
+        if backend not in ('json', 'sqlite'):
+            raise ValueError(f"Unknown storage backend '{backend}'")
+        self.store: Optional[SqliteStorage] = SqliteStorage(sqlite_path) if backend == 'sqlite' else None
+        self.database: Dict[str, Dict] = {}  # custom_id -> coaster data (SqliteRecords with SQLite)
         self.mapping: Dict[str, str] = {}  # rcdb_id -> custom_id
+        self.by_rcdb: Dict[str, List[str]] = {}  # rcdb_id -> custom_ids of all its tracks, database order
+        self.rcdb_of: Dict[str, str] = {}  # custom_id -> rcdb_id
+        self.parks: Optional[ParkResolver] = None  # Resolves new coasters to a parkId
+        self.elements = ElementIndex(self.database_path.parent / "elements.json")  # Rebuilt on save
+        self.journal = DatabaseJournal(self.database_path.with_name(self.database_path.stem + ".journal.jsonl"))
+        self.backups = BackupStore(self.database_path.parent / "backups")
+        self.dirty_ids: Set[str] = set()  # Records whose data changed since the last save
+        self._touched_ids: Set[str] = set()  # Records whose lastScraped moved since the last save
+        self.changes: List[Dict] = []  # {id, field, old, new} of the last merge_coasters call
+        self._unsaved_mapping: Set[str] = set()  # Mapping entries set since the last save
         
         self._load_files()
+        # Next free custom IDs, per park; skips every ID the database or mapping uses
+        self.ids = IdAllocator(list(self.database) + list(self.mapping.values()),
+                               self.parks.parks if self.parks is not None else None)
     
     def _load_files(self):
         """Load database and mapping files"""
-        # Load database
-        if self.database_path.exists():
-            with open(self.database_path, 'r', encoding='utf-8') as f:
-                self.database = json.load(f)
-            print(f"✓ Loaded {len(self.database)} coasters from database")
-        
-        # Load mapping
-        if self.mapping_path.exists():
-            with open(self.mapping_path, 'r', encoding='utf-8') as f:
-                self.mapping = json.load(f)
-            print(f"✓ Loaded {len(self.mapping)} mappings")
+        imported = False
+        index = None  # (custom ID, rcdbId) of every record, when known without reading the records
+        if self.store is not None and not self.store.is_empty():
+            # Records are read when first used; only the IDs are needed to start
+            index = self.store.index()
+            self.database = SqliteRecords(self.store, (custom_id for custom_id, _ in index))
+            self.mapping = self.store.load_mapping()
+            print(f"✓ Loaded {len(self.database)} coasters and {len(self.mapping)} mappings from {self.store.path}")
+        else:
+            # Load database
+            if self.database_path.exists():
+                self.database = load_database(self.database_path)
+                print(f"✓ Loaded {len(self.database)} coasters from database")
+            
+            # Load mapping
+            if self.mapping_path.exists():
+                self.mapping = load_json(self.mapping_path, default={})
+                print(f"✓ Loaded {len(self.mapping)} mappings")
+            
+            # Saves since the last snapshot
+            replayed = self.journal.replay(self.database, self.mapping, repair=True)
+            if replayed:
+                print(f"✓ Replayed {replayed} journal saves ({len(self.database)} coasters)")
+            
+            # First use of the SQLite file: import everything (the JSON export stays
+            # pending, so the next full save also folds the journal)
+            if self.store is not None:
+                self.store.write(self.database, self.mapping, self.database, self.mapping)
+                imported = True
+                print(f"✓ Imported {len(self.database)} coasters into {self.store.path}")
+        
+        if index is None:
+            # Records are held as CoasterRecords (dict-like, a fraction of the memory)
+            compact_database(self.database)
+            index = [(custom_id, coaster.get('rcdbId')) for custom_id, coaster in self.database.items()]
+        
+        # Secondary indexes, kept in step with the database by _index_record
+        for custom_id, rcdb_id in index:
+            self._index_record(custom_id, rcdb_id)
+        orphaned = self.find_orphaned_mappings()
+        if orphaned:
+            print(f"⚠️  {len(orphaned)} mappings point to coasters that are not in the database "
+                  f"(e.g. RCDB {orphaned[0]} → {self.mapping[orphaned[0]]})")
+        
+        # Load parks (parks.json / countries.json next to the database)
+        parks_path = self.database_path.parent / "parks.json"
+        if parks_path.exists():
+            self.parks = ParkResolver(parks_path, self.database_path.parent / "countries.json")
+            if isinstance(self.database, SqliteRecords):
+                self.parks.index_database(self.store.query(fields=('rcdbParkId',)))
+            else:
+                self.parks.index_database(self.database)
+            self.parks.reserve(self.mapping.values())
+            print(f"✓ Loaded {len(self.parks.parks)} parks")
+            if imported:
+                self.store.write_parks(self.parks.parks, self.parks.countries)
+    
+    def _index_record(self, custom_id: str, rcdb_id):
+        """Point the rcdbId indexes at a record's current rcdbId"""
+        new_rcdb_id = str(rcdb_id) if rcdb_id else None
+        old_rcdb_id = self.rcdb_of.get(custom_id)
+        if old_rcdb_id == new_rcdb_id:
+            return
+        if old_rcdb_id is not None:
+            tracks = self.by_rcdb[old_rcdb_id]
+            tracks.remove(custom_id)
+            if not tracks:
+                del self.by_rcdb[old_rcdb_id]
+            del self.rcdb_of[custom_id]
+        if new_rcdb_id is not None:
+            self.by_rcdb.setdefault(new_rcdb_id, []).append(custom_id)
+            self.rcdb_of[custom_id] = new_rcdb_id
+    
+    def _add_coaster(self, custom_id: str, coaster: Dict):
+        """Store a new record under custom_id and index it"""
+        record = CoasterRecord(coaster)
+        record['id'] = custom_id
+        self.database[custom_id] = record
+        self._index_record(custom_id, record.get('rcdbId'))
+        self.dirty_ids.add(custom_id)
+    
+    def _set_mapping(self, rcdb_id: str, custom_id: str):
+        """Set a mapping entry (journaled on the next save)"""
+        self.mapping[rcdb_id] = custom_id
+        self._unsaved_mapping.add(rcdb_id)
+    
+    def close(self):
+        """Close the SQLite connection (records not read yet cannot be read afterwards)"""
+        if self.store is not None:
+            self.store.close()
+    
+    def find_orphaned_mappings(self) -> List[str]:
+        """RCDB IDs whose mapping points to a custom ID that is not in the database"""
+        return [rcdb_id for rcdb_id, custom_id in self.mapping.items() if custom_id not in self.database]
     
     def _is_alpine_coaster(self, coaster: Dict) -> bool:
         """Check if coaster is an Alpine/Mountain coaster (to be filtered out)"""
@@ -58,121 +456,172 @@ class DatabaseMerger:
             manufacturer == 'Yamasakutalab'
         )
     
-    def merge_coasters(self, scraped_coasters: List[Dict]) -> Dict:
+    def merge_coasters(self, scraped_coasters: Iterable[Union[Dict, List[Dict]]]) -> Dict:
         """
-        Merge list of scraped coasters into database
+        Merge scraped coasters into database
         
         Args:
-            scraped_coasters: List of coaster dicts from scraper
+            scraped_coasters: Coaster dicts from scraper, or lists of the tracks
+                of one page; any iterable (see merge_stream)
             
         Returns:
-            Stats about merge operation
+            Stats about merge operation; "changes" lists every field that changed
+            on an existing record as {id, field, old, new}. Records that were
+            scraped again without any change count as "unchanged", not "updated".
         """
-        updated_count = 0
-        added_count = 0
-        preserved_splits = 0
-        updated_ids = []
-        added_ids = []
-        skipped_count = 0
-        filtered_alpine = 0
+        stats = {
+            "updated": 0,
+            "unchanged": 0,
+            "added": 0,
+            "preserved_splits": 0,
+            "skipped": 0,
+            "filtered_alpine": 0,
+            "updated_ids": [],
+            "added_ids": [],
+            "changes": [],
+        }
+        for result in self.merge_stream(scraped_coasters):
+            for key in ("updated", "unchanged", "added", "skipped", "filtered_alpine"):
+                stats[key] += result[key]
+            stats["preserved_splits"] += result["preserved_split"]
+            stats["updated_ids"].extend(result["updated_ids"])
+            stats["added_ids"].extend(result["added_ids"])
+            stats["changes"].extend(result["changes"])
+        stats["total_coasters"] = len(self.database)
+        self.changes = stats["changes"]
+        return stats
+    
+    def merge_stream(self, scraped_coasters: Iterable[Union[Dict, List[Dict]]]) -> Iterator[Dict]:
+        """
+        Merge scraped coasters one RCDB page at a time, yielding a result per page
+        
+        Items are coaster dicts, or lists with the tracks of one page as
+        fetch_coaster returns them; consecutive dicts with the same rcdbId are
+        merged as one page too. Nothing is read ahead beyond the next item, so
+        memory stays flat however long the stream is, and the consumer decides
+        when to save (see merge_page for the result).
+        """
+        page: List[Dict] = []
+        for item in scraped_coasters:
+            tracks = item if isinstance(item, list) else [item]
+            if page and tracks and str(tracks[0].get('rcdbId')) != str(page[0].get('rcdbId')):
+                yield self.merge_page(page)
+                page = []
+            page.extend(tracks)
+            if isinstance(item, list):
+                # A whole page: no more tracks of it can follow
+                yield self.merge_page(page)
+                page = []
+        if page:
+            yield self.merge_page(page)
+    
+    def merge_page(self, scraped_tracks: List[Dict]) -> Dict:
+        """
+        Merge the coaster(s) scraped from one RCDB page
         
-        # Group scraped coasters by RCDB ID to detect splits
-        rcdb_groups = {}
-        for coaster in scraped_coasters:
+        Returns:
+            {rcdbId, updated, unchanged, added, skipped, filtered_alpine,
+             preserved_split, updated_ids, added_ids, changes}
+        """
+        self.changes = []
+        tracks = []
+        filtered_alpine = 0
+        for coaster in scraped_tracks:
+            # Element names live in the element index, records keep only the IDs
+            self.elements.learn(coaster.pop('elementNames', {}))
+            
             # Filter out alpine/mountain coasters
             if self._is_alpine_coaster(coaster):
                 filtered_alpine += 1
                 continue
+            tracks.append(coaster)
+        
+        rcdb_id = str(scraped_tracks[0].get('rcdbId')) if scraped_tracks else None
+        if len(tracks) > 1:
+            # Split coaster - match by track name
+            result = self._merge_split_coaster(rcdb_id, tracks)
+            result['preserved_split'] = result['updated'] > 0
+        elif tracks:
+            # Single coaster - use simple mapping
+            result = self._merge_single_coaster(rcdb_id, tracks[0])
+        else:
+            result = {"updated": 0, "unchanged": 0, "added": 0, "skipped": 0,
+                      "updated_ids": [], "added_ids": [], "preserved_split": False}
+        result.update({"rcdbId": rcdb_id, "filtered_alpine": filtered_alpine, "changes": self.changes})
+        return result
+    
+    def _merge_single_coaster(self, rcdb_id: str, coaster: Dict) -> Dict:
+        """Merge a coaster scraped as a single track"""
+        updated = 0
+        unchanged = 0
+        added = 0
+        skipped = 0
+        updated_ids = []
+        added_ids = []
+        preserved_split = False
+        
+        # Check if we have a custom ID for this RCDB ID
+        if rcdb_id in self.mapping:
+            custom_id = self.mapping[rcdb_id]
             
-            rcdb_id = str(coaster.get('rcdbId'))
-            if rcdb_id:
-                if rcdb_id not in rcdb_groups:
-                    rcdb_groups[rcdb_id] = []
-                rcdb_groups[rcdb_id].append(coaster)
-        
-        # Process each RCDB ID group
-        for rcdb_id, coasters_in_group in rcdb_groups.items():
-            is_split = len(coasters_in_group) > 1
+            # Check if multiple tracks exist with this rcdbId (manual split or scraper missed split)
+            existing_with_same_rcdb = list(self.by_rcdb.get(rcdb_id, ()))
             
-            if is_split:
-                # Split coaster - match by track name
-                result = self._merge_split_coaster(rcdb_id, coasters_in_group)
-                updated_count += result['updated']
-                added_count += result['added']
-                skipped_count += result['skipped']
-                updated_ids.extend(result['updated_ids'])
-                added_ids.extend(result['added_ids'])
-                if result['updated'] > 0:
-                    preserved_splits += 1
-            else:
-                # Single coaster - use simple mapping
-                coaster = coasters_in_group[0]
+            if len(existing_with_same_rcdb) > 1:
+                # Multiple tracks exist but scraped as single
+                # This happens when scraper doesn't detect split or coaster was manually split
+                print(f"⚠️  RCDB {rcdb_id} has {len(existing_with_same_rcdb)} tracks but scraped as single")
+                print(f"   Updating all tracks: {existing_with_same_rcdb}")
                 
-                # Check if we have a custom ID for this RCDB ID
-                if rcdb_id in self.mapping:
-                    custom_id = self.mapping[rcdb_id]
+                # Update ALL tracks with this rcdbId
+                for track_id in existing_with_same_rcdb:
+                    existing_name = self.database[track_id].get('name')
                     
-                    # Check if multiple tracks exist with this rcdbId (manual split or scraper missed split)
-                    existing_with_same_rcdb = [
-                        cid for cid, c in self.database.items() 
-                        if str(c.get('rcdbId')) == rcdb_id
-                    ]
+                    # Preserve original track name (Left/Right suffix) and
+                    # add/update split protection fields
+                    track_data = {field: value for field, value in coaster.items() if field != 'name'}
+                    if not existing_name:
+                        track_data['name'] = coaster.get('name')
+                    track_data['isSplitTrack'] = True
+                    track_data['splitGroup'] = rcdb_id
+                    track_data['trackName'] = self._extract_track_name(existing_name or '')
+                    track_data['splitSiblings'] = [tid for tid in existing_with_same_rcdb if tid != track_id]
                     
-                    if len(existing_with_same_rcdb) > 1:
-                        # Multiple tracks exist but scraped as single
-                        # This happens when scraper doesn't detect split or coaster was manually split
-                        print(f"⚠️  RCDB {rcdb_id} has {len(existing_with_same_rcdb)} tracks but scraped as single")
-                        print(f"   Updating all tracks: {existing_with_same_rcdb}")
-                        
-                        # Update ALL tracks with this rcdbId
-                        for track_id in existing_with_same_rcdb:
-                            existing_name = self.database[track_id].get('name')
-                            self._update_coaster(track_id, coaster)
-                            
-                            # Preserve original track name (Left/Right suffix)
-                            if existing_name:
-                                self.database[track_id]['name'] = existing_name
-                            
-                            # Add/update split protection fields
-                            track_name = self._extract_track_name(existing_name)
-                            siblings = [tid for tid in existing_with_same_rcdb if tid != track_id]
-                            
-                            self.database[track_id]['isSplitTrack'] = True
-                            self.database[track_id]['splitGroup'] = rcdb_id
-                            self.database[track_id]['trackName'] = track_name
-                            self.database[track_id]['splitSiblings'] = siblings
-                            
-                            updated_count += 1
-                            updated_ids.append(track_id)
-                        
-                        preserved_splits += 1
-                    elif custom_id in self.database:
-                        # Normal single coaster update
-                        self._update_coaster(custom_id, coaster)
-                        updated_count += 1
-                        updated_ids.append(custom_id)
+                    if self._update_coaster(track_id, track_data):
+                        updated += 1
+                        updated_ids.append(track_id)
                     else:
-                        # Mapping exists but coaster not in database (orphaned mapping)
-                        print(f"⚠️  Warning: Mapping exists for RCDB {rcdb_id} → {custom_id} but coaster not in database")
-                        skipped_count += 1
+                        unchanged += 1
+                
+                preserved_split = True
+            elif custom_id in self.database:
+                # Normal single coaster update
+                if self._update_coaster(custom_id, coaster):
+                    updated += 1
+                    updated_ids.append(custom_id)
                 else:
-                    # New coaster - need to assign custom ID
-                    custom_id = self._assign_new_id(coaster)
-                    self.database[custom_id] = coaster
-                    self.database[custom_id]['id'] = custom_id
-                    self.mapping[rcdb_id] = custom_id
-                    added_count += 1
-                    added_ids.append(custom_id)
+                    unchanged += 1
+            else:
+                # Mapping exists but coaster not in database (orphaned mapping)
+                print(f"⚠️  Warning: Mapping exists for RCDB {rcdb_id} → {custom_id} but coaster not in database")
+                skipped += 1
+        else:
+            # New coaster - need to assign custom ID
+            custom_id = self._assign_new_id(coaster)
+            self._add_coaster(custom_id, coaster)
+            self._mark_scraped(self.database[custom_id], changed=True)
+            self._set_mapping(rcdb_id, custom_id)
+            added += 1
+            added_ids.append(custom_id)
         
         return {
-            "updated": updated_count,
-            "added": added_count,
-            "preserved_splits": preserved_splits,
-            "skipped": skipped_count,
-            "filtered_alpine": filtered_alpine,
-            "total_coasters": len(self.database),
+            "updated": updated,
+            "unchanged": unchanged,
+            "added": added,
+            "skipped": skipped,
             "updated_ids": updated_ids,
-            "added_ids": added_ids
+            "added_ids": added_ids,
+            "preserved_split": preserved_split,
         }
     
     def _merge_split_coaster(self, rcdb_id: str, scraped_tracks: List[Dict]) -> Dict:
@@ -189,13 +638,13 @@ class DatabaseMerger:
         """
         updated_ids = []
         added_ids = []
+        unchanged = 0
         skipped = 0
         
         # Find all existing coasters with this RCDB ID in database
         existing_with_rcdb = {
-            custom_id: coaster 
-            for custom_id, coaster in self.database.items() 
-            if str(coaster.get('rcdbId')) == rcdb_id
+            custom_id: self.database[custom_id]
+            for custom_id in self.by_rcdb.get(rcdb_id, ())
         }
         
         # Try to match scraped tracks to existing tracks by name
@@ -229,14 +678,10 @@ class DatabaseMerger:
                 matched_pairs.append((None, scraped_track))
         
         # Collect all custom IDs for this split group (for splitSiblings)
-        all_track_ids = []
-        for matched_id, scraped_track in matched_pairs:
-            if matched_id:
-                all_track_ids.append(matched_id)
-            else:
-                # Will create new ID
-                new_id = self._assign_new_id(scraped_track)
-                all_track_ids.append(new_id)
+        # New tracks get their IDs reserved together, as consecutive track numbers
+        new_tracks = [scraped_track for matched_id, scraped_track in matched_pairs if not matched_id]
+        new_ids = iter(self._assign_new_ids(new_tracks[0], len(new_tracks)) if new_tracks else [])
+        all_track_ids = [matched_id or next(new_ids) for matched_id, _ in matched_pairs]
         
         # Now update/add each track with split protection fields
         for i, (matched_id, scraped_track) in enumerate(matched_pairs):
@@ -254,21 +699,24 @@ class DatabaseMerger:
             
             if matched_id:
                 # Update existing track
-                self._update_coaster(matched_id, scraped_track, preserve_split=True)
-                updated_ids.append(matched_id)
+                if self._update_coaster(matched_id, scraped_track, preserve_split=True):
+                    updated_ids.append(matched_id)
+                else:
+                    unchanged += 1
             else:
                 # Add new track
                 custom_id = all_track_ids[i]
-                self.database[custom_id] = scraped_track
-                self.database[custom_id]['id'] = custom_id
+                self._add_coaster(custom_id, scraped_track)
+                self._mark_scraped(self.database[custom_id], changed=True)
                 added_ids.append(custom_id)
             
             # Ensure mapping exists (map to first track's ID by convention)
             if rcdb_id not in self.mapping:
-                self.mapping[rcdb_id] = all_track_ids[0]
+                self._set_mapping(rcdb_id, all_track_ids[0])
         
         return {
             "updated": len(updated_ids),
+            "unchanged": unchanged,
             "added": len(added_ids),
             "skipped": skipped,
             "updated_ids": updated_ids,
@@ -292,100 +740,293 @@ class DatabaseMerger:
         words = full_name.split()
         return words[-1] if words else full_name
     
-    def _update_coaster(self, custom_id: str, scraped_data: Dict, preserve_split: bool = False):
-        """Update existing coaster with scraped data"""
+    def _update_coaster(self, custom_id: str, scraped_data: Dict, preserve_split: bool = False) -> bool:
+        """
+        Update existing coaster with scraped data, field by field
+        
+        Only fields whose value differs are written (and listed in self.changes).
+        Returns True if anything but parserVersion changed.
+        """
         existing = self.database[custom_id]
         
         # Fields to update from RCDB
         update_fields = [
             'name', 'parkName', 'city', 'country', 'status', 'opened',
             'manufacturer', 'model', 'type', 'design',
-            'height', 'drop', 'angle', 'verticalAngle', 'speed', 'length', 'inversions', 'elements', 'duration'
+            'height', 'drop', 'angle', 'verticalAngle', 'speed', 'length', 'inversions', 'elements', 'duration',
+            'extraStats', 'parserVersion', 'rcdbParkId', 'sourceUnits'
         ]
         
+        changed = False
         for field in update_fields:
-            if field in scraped_data and scraped_data[field]:
-                existing[field] = scraped_data[field]
+            if field in scraped_data and self._has_value(scraped_data[field]):
+                if self._set_field(custom_id, field, scraped_data[field]) and field != 'parserVersion':
+                    changed = True
         
         # Always update rcdbId
         if 'rcdbId' in scraped_data:
-            existing['rcdbId'] = scraped_data['rcdbId']
+            changed |= self._set_field(custom_id, 'rcdbId', scraped_data['rcdbId'])
+            self._index_record(custom_id, scraped_data['rcdbId'])
         
         # Add/preserve split protection fields if this is a split coaster
         if preserve_split or scraped_data.get('isSplitTrack'):
-            existing['isSplitTrack'] = scraped_data.get('isSplitTrack', True)
-            existing['splitGroup'] = scraped_data.get('splitGroup', existing.get('splitGroup'))
-            existing['trackName'] = scraped_data.get('trackName', existing.get('trackName'))
-            existing['splitSiblings'] = scraped_data.get('splitSiblings', existing.get('splitSiblings', []))
+            split_fields = {
+                'isSplitTrack': scraped_data.get('isSplitTrack', True),
+                'splitGroup': scraped_data.get('splitGroup', existing.get('splitGroup')),
+                'trackName': scraped_data.get('trackName', existing.get('trackName')),
+                'splitSiblings': scraped_data.get('splitSiblings', existing.get('splitSiblings', [])),
+            }
+            for field, value in split_fields.items():
+                changed |= self._set_field(custom_id, field, value)
+        
+        self._mark_scraped(existing, changed)
+        if not changed:
+            self._touched_ids.add(custom_id)
+        return changed
+    
+    def _set_field(self, custom_id: str, field: str, value) -> bool:
+        """Set one field if its value differs; records the change and marks the record dirty"""
+        existing = self.database[custom_id]
+        old = existing.get(field)
+        if field in existing and old == value:
+            return False
+        existing[field] = value
+        self.changes.append({'id': custom_id, 'field': field, 'old': old, 'new': value})
+        self.dirty_ids.add(custom_id)
+        return True
+    
+    @staticmethod
+    def _has_value(value) -> bool:
+        """Empty strings, lists and dicts and None count as missing; 0 is a value"""
+        if isinstance(value, (str, list, dict)):
+            return bool(value)
+        return value is not None
+    
+    def _mark_scraped(self, coaster: Dict, changed: bool):
+        """Set lastScraped (and lastChanged when the data changed)"""
+        now = datetime.now().strftime(TIMESTAMP_FORMAT)
+        coaster['lastScraped'] = now
+        if changed:
+            coaster['lastChanged'] = now
+    
+    def mark_unchanged(self, rcdb_ids: Iterable[Union[int, str]]) -> int:
+        """
+        Set lastScraped on the records of RCDB pages that were fetched but had not
+        changed (the page cache skips merging those). Returns the number of records.
+        """
+        marked = 0
+        for rcdb_id in {str(rcdb_id) for rcdb_id in rcdb_ids}:
+            for custom_id in self.by_rcdb.get(rcdb_id, ()):
+                self._mark_scraped(self.database[custom_id], changed=False)
+                self._touched_ids.add(custom_id)
+                marked += 1
+        return marked
     
     def _is_split_coaster(self, rcdb_id: str) -> bool:
         """Check if this RCDB ID has other tracks (manual splits)"""
-        # Count how many custom IDs map to this RCDB ID
-        count = sum(1 for rid in self.mapping.values() if self.mapping.get(rid) == rcdb_id)
-        return count > 1
+        return len(self.by_rcdb.get(str(rcdb_id), ())) > 1
     
     def _assign_new_id(self, coaster: Dict) -> str:
-        """Assign new custom ID for coaster"""
-        # Try to extract country and park from coaster data
-        # This is a simplified version - in production you'd have proper mapping
-        
-        # For now, use a simple sequential ID
-        # Find highest ID number
-        max_id = 0
-        for custom_id in self.database.keys():
-            if custom_id.startswith('C') and len(custom_id) >= 10:
-                try:
-                    # Extract numeric parts
-                    num = int(custom_id[7:])
-                    if num > max_id:
-                        max_id = num
-                except ValueError:
-                    pass
-        
-        # Generate new ID (this is simplified - real version would use proper country/park codes)
-        new_id = f"C999{max_id + 1:06d}"
-        return new_id
-    
-    def save(self, backup: bool = True):
+        """
+        Assign new custom ID for coaster: C + parkId + next 2-digit track number
+        Falls back to a C999 placeholder when the park cannot be resolved
+        """
+        return self._assign_new_ids(coaster, 1)[0]
+    
+    def _assign_new_ids(self, coaster: Dict, count: int) -> List[str]:
+        """Reserve count new IDs in the coaster's park (placeholders if it has no room)"""
+        park_id = self.parks.resolve(coaster) if self.parks is not None else None
+        if park_id:
+            new_ids = self.ids.allocate(park_id, count)
+            if new_ids:
+                for _ in new_ids:
+                    self.parks.add_coaster(park_id)
+                return new_ids
+        new_ids = [self.ids.allocate_placeholder() for _ in range(count)]
+        if self.parks is not None:
+            self.parks.reserve(new_ids)
+        return new_ids
+    
+    def merge_duplicate(self, keep_id: str, drop_id: str) -> List[str]:
+        """
+        Fold a duplicate record into the record that is kept
+        
+        Fields the kept record lacks are taken from the duplicate, mapping entries
+        pointing at the duplicate are redirected and the duplicate is removed
+        (saved as a removal). Returns the redirected RCDB IDs.
+        """
+        drop = self.database.pop(drop_id)
+        self._index_record(drop_id, None)
+        self.dirty_ids.add(drop_id)
+        
+        for field, value in drop.items():
+            if field != 'id' and self._has_value(value) and not self._has_value(self.database[keep_id].get(field)):
+                self._set_field(keep_id, field, value)
+        self._index_record(keep_id, self.database[keep_id].get('rcdbId'))
+        
+        rcdb_id = str(drop['rcdbId']) if drop.get('rcdbId') else None
+        redirected = [rcdb_id] if rcdb_id and self.mapping.get(rcdb_id) == drop_id else []
+        for rcdb_id in redirected:
+            self._set_mapping(rcdb_id, keep_id)
+        
+        if self.parks is not None:
+            self.parks.remove_coaster(park_id_of(drop_id))
+        return redirected
+    
+    def mark_dirty(self, custom_ids: Iterable[str] = (), rcdb_ids: Iterable[str] = ()):
+        """Flag records and mapping entries changed outside merge_coasters, so save() writes them"""
+        self.dirty_ids.update(custom_ids)
+        self._unsaved_mapping.update(str(rcdb_id) for rcdb_id in rcdb_ids)
+    
+    def save(self, backup: bool = True, compact: bool = True):
         """
         Save database and mapping to files
         
+        Only what changed since the last save is considered: with nothing changed
+        nothing is written, and when only lastScraped moved (and the journal holds
+        no changes either) the records are journaled instead of rewriting the snapshot.
+        With the SQLite backend every save commits the changed rows in one
+        transaction instead, and the JSON files are exported as build artifacts.
+        
         Args:
-            backup: If True, create backup before saving
+            backup: If True, create backup before writing a new snapshot
+            compact: If True, write coasters_master.json and the mapping (temp file,
+                then swapped in) and empty the journal. If False, only append the
+                records changed since the last save to the journal; it is compacted
+                anyway once it grows past half the size of the snapshot. With SQLite:
+                whether to export the JSON files.
         """
+        if self.store is not None:
+            self._save_sqlite(backup, compact)
+        else:
+            self._save_json(backup, compact)
+        self.dirty_ids.clear()
+        self._touched_ids.clear()
+        self._unsaved_mapping.clear()
+        
+        # Save parks (only written when new parks or coasters were added)
+        if self.parks is not None and self.parks.save() and self.store is not None:
+            self.store.write_parks(self.parks.parks, self.parks.countries)
+    
+    def export_pending(self) -> bool:
+        """True when coasters_master.json lags behind saved changes (journal or SQLite)"""
+        if self.store is not None:
+            return self.store.export_pending()
+        return self.journal.size() > 0
+    
+    def _save_json(self, backup: bool, compact: bool):
+        data_changed = bool(self.dirty_ids or self._unsaved_mapping or self.journal.pending_changes)
+        unsaved_ids = self.dirty_ids | self._touched_ids
+        journal_size = self.journal.size()
+        
+        if not unsaved_ids and not self._unsaved_mapping and not (compact and self.journal.pending_changes):
+            print("✓ No changes to save")
+        elif (not compact or not data_changed) and journal_size < self._snapshot_size() // 2:
+            self.journal.append(
+                {custom_id: self.database.get(custom_id) for custom_id in sorted(unsaved_ids)},
+                {rcdb_id: self.mapping.get(rcdb_id) for rcdb_id in sorted(self._unsaved_mapping)},
+                changed=len(self.dirty_ids) + len(self._unsaved_mapping)
+            )
+            print(f"✓ Journaled {len(unsaved_ids)} coasters ({len(self.dirty_ids)} changed): {self.journal.path}")
+        else:
+            self._export_json(backup)
+    
+    def _save_sqlite(self, backup: bool, compact: bool):
+        unsaved_ids = self.dirty_ids | self._touched_ids
+        if unsaved_ids or self._unsaved_mapping:
+            self.store.write(self.database, self.mapping, sorted(unsaved_ids), sorted(self._unsaved_mapping),
+                             changed=bool(self.dirty_ids or self._unsaved_mapping))
+            print(f"✓ Committed {len(unsaved_ids)} coasters ({len(self.dirty_ids)} changed): {self.store.path}")
+        elif not (compact and self.store.export_pending()):
+            print("✓ No changes to save")
+        
+        # The JSON files are exported only when the data changed since the last export
+        if compact and self.store.export_pending():
+            self._export_json(backup)
+            self.store.mark_exported()
+    
+    def _export_json(self, backup: bool):
+        """Write coasters_master.json, the mapping and the element index"""
         if backup:
             self._create_backup()
         
         # Save database
-        with open(self.database_path, 'w', encoding='utf-8') as f:
-            json.dump(self.database, f, indent=2, ensure_ascii=False)
+        self._write_json(self.database_path, self.database, indent=2, ensure_ascii=False)
         print(f"✓ Saved database: {self.database_path}")
         
         # Save mapping
-        with open(self.mapping_path, 'w', encoding='utf-8') as f:
-            json.dump(self.mapping, f, indent=2)
+        self._write_json(self.mapping_path, self.mapping, indent=2)
         print(f"✓ Saved mapping: {self.mapping_path}")
-    
-    def _create_backup(self):
-        """Create timestamped backup of database files in backup folder"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # Create backup folder if it doesn't exist
-        backup_dir = self.database_path.parent / "backups"
-        backup_dir.mkdir(exist_ok=True)
+        # The next start reads these instead of parsing the files again
+        write_snapshot(self.database_path, self.database, compact=True)
+        write_snapshot(self.mapping_path, self.mapping)
         
-        # Backup database
-        if self.database_path.exists():
-            backup_path = backup_dir / f"coasters_master.json.backup_{timestamp}"
-            shutil.copy(self.database_path, backup_path)
-            print(f"✓ Created backup: {backup_path}")
+        # Both snapshots hold every journaled save now
+        self.journal.clear()
         
-        # Backup mapping
-        if self.mapping_path.exists():
-            backup_path = backup_dir / f"rcdb_to_custom_mapping.json.backup_{timestamp}"
-            shutil.copy(self.mapping_path, backup_path)
+        # Rebuild the element -> coasters index
+        self.elements.build(self.database)
+        self.elements.save()
+        print(f"✓ Saved element index: {self.elements.path} ({len(self.elements.coasters)} elements)")
+    
+    def _snapshot_size(self) -> int:
+        return self.database_path.stat().st_size if self.database_path.exists() else 0
+    
+    @staticmethod
+    def _write_json(path: Path, data: Dict, **options):
+        """Write to a temp file first, then swap it in, so a crash never leaves half a file"""
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, default=json_default, **options)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    
+    def _create_backup(self):
+        """Back up database and mapping into the backups folder (full snapshot or delta)"""
+        if not self.backups.backups and self.database_path.exists():
+            # First backup: keep the files as they are on disk too, so this save can be undone
+            database = load_database(self.database_path)
+            mapping = load_json(self.mapping_path, default={})
+            self.backups.backup(database, mapping)
+        backup_path = self.backups.backup(self.database, self.mapping)
+        if backup_path is not None:
             print(f"✓ Created backup: {backup_path}")
 
 
+def main():
+    parser = argparse.ArgumentParser(
+        description="Move the database to SQLite, or export the JSON files from it",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Import coasters_master.json (and mapping, parks, countries) into coasters_master.sqlite;
+  # every script uses the SQLite file from then on
+  python database_merger_simple.py import
+
+  # Write coasters_master.json and the mapping from the SQLite file
+  python database_merger_simple.py export
+        """
+    )
+    parser.add_argument('command', choices=['import', 'export'])
+    args = parser.parse_args()
+
+    database_dir = Path(__file__).parent.parent.parent / "database" / "data"
+    database_path = database_dir / "coasters_master.json"
+    if args.command == 'import' and database_path.with_suffix('.sqlite').exists():
+        parser.error(f"{database_path.with_suffix('.sqlite')} already exists")
+    if args.command == 'export' and not database_path.with_suffix('.sqlite').exists():
+        parser.error(f"{database_path.with_suffix('.sqlite')} does not exist (run import first)")
+
+    merger = DatabaseMerger(str(database_path), str(database_dir / "rcdb_to_custom_mapping.json"), backend='sqlite')
+    if args.command == 'export':
+        merger._export_json(backup=False)
+        merger.store.mark_exported()
+    else:
+        merger.save(backup=False)
+    merger.close()
+
+
 if __name__ == "__main__":
-    print("Database Merger - Use test_merger.py for testing")
+    main()
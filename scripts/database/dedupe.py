@@ -0,0 +1,338 @@
+"""
+Duplicate Coaster Finder
+Finds records that describe the same coaster (C999 placeholders and accidental
+duplicates) and folds them into one through DatabaseMerger, rewriting the coaster
+IDs in the user profiles
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from database_merger_simple import DatabaseMerger
+from park_resolver import is_placeholder, park_name_key
+
+REPO_DIR = Path(__file__).parent.parent.parent
+DATA_DIR = REPO_DIR / "database" / "data"
+PROFILES_DIR = REPO_DIR / "database" / "profiles"
+
+DEFAULT_THRESHOLD = 0.85
+# Trigrams shared by more records than this in one country (and opening year
+# window) say little about a match ("er ", "ste") and would make the blocks
+# quadratic, so they are skipped
+MAX_BLOCK_SIZE = 300
+# A match is only applied when the next best candidate scores at least this much lower
+MIN_MARGIN = 0.05
+
+_YEAR_RE = re.compile(r'\b(\d{4})\b')
+
+
+def trigrams(name: str) -> FrozenSet[str]:
+    """Character trigrams of a normalized name (same normalization as park names)"""
+    key = f"  {park_name_key(name)} "
+    return frozenset(key[i:i + 3] for i in range(len(key) - 2))
+
+
+def opening_year(coaster: Dict) -> Optional[int]:
+    match = _YEAR_RE.search(str(coaster.get('opened') or ''))
+    return int(match.group(1)) if match else None
+
+
+class DuplicateFinder:
+    """
+    Candidate pairs come from blocks of records sharing a country, a name
+    trigram and an opening year, so only records that look alike are ever
+    compared. Years one apart are compared too, and a record without a known
+    year is compared with every year of its block. Two records with different
+    rcdbIds are different coasters, so pairs of records that both have one
+    are only checked by rcdbId (split tracks excepted).
+
+    Score: 0.8 × trigram similarity of the names + 0.1 for a matching opening
+    year + 0.1 for a matching manufacturer (half of each when unknown). A
+    different park, or opening years more than a year apart, rule a pair out.
+    """
+
+    def __init__(self, database: Dict[str, Dict], mapping: Dict[str, str], parks: Optional[Dict[str, Dict]] = None):
+        self.database = database
+        self.parks = parks or {}  # parks.json, tells placeholders from real 999 parks
+        self.mapped_ids: Set[str] = set(mapping.values())
+        self._trigrams: Dict[str, FrozenSet[str]] = {
+            custom_id: trigrams(coaster.get('name') or '') for custom_id, coaster in database.items()
+        }
+        self._years: Dict[str, Optional[int]] = {
+            custom_id: opening_year(coaster) for custom_id, coaster in database.items()
+        }
+
+    def is_placeholder(self, custom_id: str) -> bool:
+        return is_placeholder(custom_id, self.parks)
+
+    def _blocks(self) -> Dict[Tuple[str, str], Dict[Optional[int], List[str]]]:
+        """(country, trigram) -> opening year (None if unknown) -> records"""
+        blocks: Dict[Tuple[str, str], Dict[Optional[int], List[str]]] = {}
+        for custom_id, coaster in self.database.items():
+            country = (coaster.get('country') or '').casefold()
+            year = self._years[custom_id]
+            for trigram in self._trigrams[custom_id]:
+                blocks.setdefault((country, trigram), {}).setdefault(year, []).append(custom_id)
+        return blocks
+
+    def candidates(self) -> Set[Tuple[str, str]]:
+        """Pairs (sorted) sharing a block where at least one record has no rcdbId, plus rcdbId twins"""
+        pairs: Set[Tuple[str, str]] = set()
+        for by_year in self._blocks().values():
+            if len(by_year) == 1 and len(next(iter(by_year.values()))) < 2:
+                continue
+            for year, custom_ids in by_year.items():
+                if all(self.database[custom_id].get('rcdbId') for custom_id in custom_ids):
+                    continue
+                if year is None:
+                    block = [other_id for other_ids in by_year.values() for other_id in other_ids]
+                else:
+                    block = [other_id for other_year in (year - 1, year, year + 1, None)
+                             for other_id in by_year.get(other_year, ())]
+                if len(block) > MAX_BLOCK_SIZE:
+                    continue
+                for custom_id in custom_ids:
+                    if self.database[custom_id].get('rcdbId'):
+                        continue
+                    for other_id in block:
+                        if other_id != custom_id:
+                            pairs.add((custom_id, other_id) if custom_id < other_id else (other_id, custom_id))
+
+        by_rcdb: Dict[str, List[str]] = {}
+        for custom_id, coaster in self.database.items():
+            if coaster.get('rcdbId') and not coaster.get('isSplitTrack'):
+                by_rcdb.setdefault(str(coaster['rcdbId']), []).append(custom_id)
+        for custom_ids in by_rcdb.values():
+            for i, custom_id in enumerate(custom_ids):
+                for other_id in custom_ids[i + 1:]:
+                    pairs.add((custom_id, other_id) if custom_id < other_id else (other_id, custom_id))
+        return pairs
+
+    def score(self, first_id: str, second_id: str) -> Optional[float]:
+        """Likelihood that two records are the same coaster (None if they cannot be)"""
+        first, second = self.database[first_id], self.database[second_id]
+        if first.get('rcdbId') and second.get('rcdbId'):
+            if str(first['rcdbId']) != str(second['rcdbId']) or first.get('isSplitTrack') or second.get('isSplitTrack'):
+                return None
+        if first.get('parkName') and second.get('parkName') and \
+                park_name_key(first['parkName']) != park_name_key(second['parkName']):
+            return None
+
+        first_year, second_year = opening_year(first), opening_year(second)
+        if first_year and second_year:
+            if abs(first_year - second_year) > 1:
+                return None
+            year_score = 1.0 if first_year == second_year else 0.5
+        else:
+            year_score = 0.5
+
+        first_maker, second_maker = first.get('manufacturer'), second.get('manufacturer')
+        if first_maker and second_maker:
+            maker_score = 1.0 if first_maker.casefold() == second_maker.casefold() else 0.0
+        else:
+            maker_score = 0.5
+
+        first_trigrams, second_trigrams = self._trigrams[first_id], self._trigrams[second_id]
+        name_score = 2 * len(first_trigrams & second_trigrams) / (len(first_trigrams) + len(second_trigrams))
+        return 0.8 * name_score + 0.1 * year_score + 0.1 * maker_score
+
+    def keeper(self, first_id: str, second_id: str) -> Tuple[str, str]:
+        """(record to keep, duplicate): mapped, with rcdbId, real ID, most fields, lowest ID"""
+        def rank(custom_id: str):
+            coaster = self.database[custom_id]
+            filled = sum(1 for value in coaster.values() if value not in (None, '', [], {}))
+            return (custom_id in self.mapped_ids, bool(coaster.get('rcdbId')),
+                    not self.is_placeholder(custom_id), filled)
+        if rank(second_id) > rank(first_id):
+            return second_id, first_id
+        return first_id, second_id
+
+    def find(self, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+        """
+        Proposed merges, best first: {keep, drop, score, ambiguous}
+
+        A proposal is ambiguous when the duplicate has another candidate scoring
+        within MIN_MARGIN of its best (e.g. a placeholder "Boomerang" matching
+        the Boomerangs of two parks).
+        """
+        scored = []
+        for first_id, second_id in self.candidates():
+            score = self.score(first_id, second_id)
+            if score is not None and score >= threshold:
+                keep_id, drop_id = self.keeper(first_id, second_id)
+                scored.append({'keep': keep_id, 'drop': drop_id, 'score': round(score, 3)})
+        scored.sort(key=lambda match: (-match['score'], match['drop'], match['keep']))
+
+        # Best two scores of every record, from either side of a pair
+        top_scores: Dict[str, List[float]] = {}
+        for match in scored:
+            for custom_id in (match['keep'], match['drop']):
+                scores = top_scores.setdefault(custom_id, [])
+                if len(scores) < 2:
+                    scores.append(match['score'])
+        for match in scored:
+            scores = top_scores[match['drop']]
+            match['ambiguous'] = len(scores) > 1 and scores[0] - scores[1] < MIN_MARGIN
+        return scored
+
+
+def merge_profile_entry(kept: Dict, dropped: Dict):
+    """
+    Fold a profile entry for a merged-away coaster into the entry that stays
+
+    The better (lower) rank wins; other fields the kept entry lacks are taken over.
+    """
+    for field, value in dropped.items():
+        if field == 'coasterId' or value is None:
+            continue
+        if field == 'rank' and kept.get('rank') is not None:
+            kept['rank'] = min(kept['rank'], value)
+        elif kept.get(field) is None:
+            kept[field] = value
+
+
+def rewrite_profiles(profiles_dir: Path, redirects: Dict[str, str]) -> int:
+    """
+    Point profile coaster IDs at the records they were merged into
+
+    An entry whose coaster is already in the profile is collapsed into that
+    entry (see merge_profile_entry). Returns the number of entries changed.
+    """
+    changed_total = 0
+    collapsed_total = 0
+    for path in sorted(profiles_dir.glob('*.json')):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            content = f.read()
+        newline = '\r\n' if '\r\n' in content else '\n'
+        profile = json.loads(content)
+
+        entries = profile.get('coasters', [])
+        by_id = {entry['coasterId']: entry for entry in entries if entry['coasterId'] not in redirects}
+        coasters = []
+        changed = 0
+        collapsed = 0
+        for entry in entries:
+            coaster_id = redirects.get(entry['coasterId'])
+            if coaster_id is not None:
+                changed += 1
+                kept = by_id.get(coaster_id)
+                if kept is not None:
+                    merge_profile_entry(kept, entry)
+                    collapsed += 1
+                    continue
+                entry['coasterId'] = coaster_id
+                by_id[coaster_id] = entry
+            coasters.append(entry)
+        if not changed:
+            continue
+
+        profile['coasters'] = coasters
+        changed_total += changed
+        collapsed_total += collapsed
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8', newline=newline) as f:
+            json.dump(profile, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        print(f"✓ {path.name}: {changed} coaster references rewritten, {collapsed} collapsed into existing entries")
+    if collapsed_total:
+        print(f"✓ {collapsed_total} profile entries collapsed (kept the better rank)")
+    return changed_total
+
+
+def dedupe(threshold: float = DEFAULT_THRESHOLD, apply: bool = False,
+           placeholders_only: bool = False) -> List[Dict]:
+    """
+    Find duplicate records and, with apply, merge the unambiguous ones
+
+    Args:
+        threshold: Minimum score for a proposed merge (0-1)
+        apply: If True, merge and save; otherwise only list the proposals
+        placeholders_only: Only consider merges that remove a C999 placeholder
+    """
+    merger = DatabaseMerger(str(DATA_DIR / "coasters_master.json"),
+                            str(DATA_DIR / "rcdb_to_custom_mapping.json"))
+
+    start = time.perf_counter()
+    finder = DuplicateFinder(merger.database, merger.mapping, merger.parks.parks if merger.parks else None)
+    matches = finder.find(threshold)
+    if placeholders_only:
+        matches = [match for match in matches if finder.is_placeholder(match['drop'])]
+    elapsed = time.perf_counter() - start
+
+    for match in matches:
+        keep, drop = merger.database[match['keep']], merger.database[match['drop']]
+        marker = '?' if match['ambiguous'] else '='
+        print(f"{match['score']:.3f} {marker} {match['drop']} {drop.get('name')!r} ({drop.get('parkName') or 'no park'})"
+              f" → {match['keep']} {keep.get('name')!r} ({keep.get('parkName') or 'no park'})")
+
+    kinds = Counter('ambiguous' if match['ambiguous'] else 'placeholder' if finder.is_placeholder(match['drop'])
+                    else 'duplicate' for match in matches)
+    print()
+    print(f"✓ {len(matches)} proposed merges in {elapsed:.2f}s: {kinds['placeholder']} placeholders, "
+          f"{kinds['duplicate']} duplicates, {kinds['ambiguous']} ambiguous (? - never applied)")
+
+    if not apply:
+        print("⚠️  PREVIEW MODE - run with --apply to merge")
+        merger.close()
+        return matches
+
+    redirects: Dict[str, str] = {}
+    for match in matches:
+        if match['ambiguous']:
+            continue
+        keep_id = redirects.get(match['keep'], match['keep'])
+        drop_id = match['drop']
+        if drop_id in redirects or keep_id == drop_id:
+            continue  # Already merged into another record this run
+        merger.merge_duplicate(keep_id, drop_id)
+        redirects[drop_id] = keep_id
+        for custom_id, target_id in redirects.items():
+            if target_id == drop_id:
+                redirects[custom_id] = keep_id
+
+    print(f"✓ Merged {len(redirects)} records")
+    if redirects:
+        merger.save(backup=True)
+        rewrite_profiles(PROFILES_DIR, redirects)
+    merger.close()
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find and merge duplicate coasters and C999 placeholders",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # List proposed merges
+  python dedupe.py
+
+  # Merge the unambiguous ones (and rewrite profile references)
+  python dedupe.py --apply
+
+  # Only reconcile C999 placeholders, with a stricter threshold
+  python dedupe.py --placeholders-only --threshold 0.9 --apply
+        """
+    )
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Minimum score for a merge, 0-1 (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--placeholders-only', action='store_true',
+                        help='Only merge C999 placeholders into scraped records')
+    parser.add_argument('--apply', action='store_true',
+                        help='Merge unambiguous duplicates and save (default: only list them)')
+    args = parser.parse_args()
+
+    if not 0 < args.threshold <= 1:
+        parser.error("--threshold must be between 0 and 1")
+
+    dedupe(threshold=args.threshold, apply=args.apply, placeholders_only=args.placeholders_only)
+
+
+if __name__ == "__main__":
+    main()
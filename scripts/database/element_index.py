@@ -0,0 +1,127 @@
+"""
+Element Index
+Inverted index from RCDB element (Zero-G Roll, Cobra Roll, ...) to the coasters that
+have it, rebuilt by DatabaseMerger.save and stored next to the database as elements.json
+"""
+
+import json
+import os
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+# Coaster lists hold the digits of the custom ID (C043004901 -> 43004901), sorted
+COASTER_ID_DIGITS = 9
+
+
+def coaster_number(custom_id: str) -> Optional[int]:
+    """Integer form of a custom coaster ID (None for IDs of another shape)"""
+    digits = custom_id[1:]
+    if not custom_id.startswith('C') or len(digits) != COASTER_ID_DIGITS or not digits.isdigit():
+        return None
+    return int(digits)
+
+
+def coaster_id(number: int) -> str:
+    """Custom coaster ID of a coaster_number"""
+    return f"C{number:0{COASTER_ID_DIGITS}d}"
+
+
+def _intersect(first: array, second: array) -> array:
+    """Intersection of two sorted arrays, in one merge pass"""
+    result = array('L')
+    i = j = 0
+    while i < len(first) and j < len(second):
+        if first[i] < second[j]:
+            i += 1
+        elif first[i] > second[j]:
+            j += 1
+        else:
+            result.append(first[i])
+            i += 1
+            j += 1
+    return result
+
+
+class ElementIndex:
+    """
+    Element ID -> sorted array of coaster numbers, plus element names
+
+    Element IDs are RCDB's (the g.htm?id= of the element link), so they stay the
+    same across runs and languages. Records whose elements are not a list yet
+    (scraped before element IDs were kept) are left out until they are reparsed.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.names: Dict[int, str] = {}  # element ID -> name
+        self.coasters: Dict[int, array] = {}  # element ID -> sorted coaster numbers
+        self.load()
+
+    def load(self):
+        """Load names and coaster lists from disk"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for element_id, entry in data.get('elements', {}).items():
+            self.names[int(element_id)] = entry['name']
+            self.coasters[int(element_id)] = array('L', entry['coasters'])
+
+    def learn(self, names: Dict[Union[int, str], str]):
+        """Remember element names seen on scraped pages"""
+        for element_id, name in names.items():
+            self.names[int(element_id)] = name
+
+    def build(self, database: Dict[str, Dict]):
+        """Rebuild the coaster lists from every record's element IDs"""
+        postings: Dict[int, List[int]] = {}
+        for custom_id, coaster in database.items():
+            elements = coaster.get('elements')
+            number = coaster_number(custom_id)
+            if not isinstance(elements, list) or number is None:
+                continue
+            for element_id in set(elements):
+                postings.setdefault(int(element_id), []).append(number)
+        self.coasters = {element_id: array('L', sorted(numbers))
+                         for element_id, numbers in postings.items()}
+
+    def save(self):
+        """Write the index (to a temp file first, then swapped in)"""
+        data = {
+            'elements': {
+                str(element_id): {
+                    'name': self.names.get(element_id, ''),
+                    'coasters': self.coasters[element_id].tolist(),
+                }
+                for element_id in sorted(self.coasters)
+            }
+        }
+        tmp_path = self.path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def find(self, name: str) -> Optional[int]:
+        """Element ID by name (case-insensitive)"""
+        wanted = name.casefold()
+        for element_id, element_name in self.names.items():
+            if element_name.casefold() == wanted:
+                return element_id
+        return None
+
+    def coasters_with(self, element_ids: Iterable[int]) -> List[str]:
+        """Custom IDs of the coasters that have all of the given elements"""
+        lists = sorted((self.coasters.get(element_id, array('L')) for element_id in element_ids), key=len)
+        if not lists:
+            return []
+        result = lists[0]
+        for other in lists[1:]:
+            result = _intersect(result, other)
+        return [coaster_id(number) for number in result]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of coasters per element name, most common first"""
+        counts = {self.names.get(element_id, str(element_id)): len(numbers)
+                  for element_id, numbers in self.coasters.items()}
+        return dict(sorted(counts.items(), key=lambda item: -item[1]))
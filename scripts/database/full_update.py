@@ -1,7 +1,7 @@
 """
 Full Database Update
 Updates ALL coasters from RCDB in one run
-This will take 10-15 hours to complete
+This will take several hours to complete
 """
 
 import json
@@ -15,8 +15,9 @@ def full_update():
     """
     Run a complete update of the entire RCDB database
     
-    This will scrape RCDB IDs 1 through 20000 (covers all existing coasters)
-    Expected time: 10-15 hours
+    This will scrape every coaster listed on RCDB (see rcdb_discovery), plus
+    the few IDs between the highest listed coaster and the end of the ID space
+    Expected time: 4-8 hours
     """
     
     # Check if there's existing progress
@@ -81,9 +82,10 @@ def full_update():
         print("This will update ALL coasters from RCDB")
         print()
         print("Details:")
-        print("  - RCDB ID range: 1 to 25,000")
-        print("  - Delay: 2 seconds per coaster")
-        print("  - Estimated time: 8-12 hours")
+        print("  - RCDB IDs: coasters from RCDB's listing pages (~12,000), no blind sweep")
+        print("  - Rate: starts at 1 request every 2 seconds, speeds up to 1 per second")
+        print("    while RCDB is healthy and backs off on errors, 4 in flight")
+        print("  - Estimated time: 4-8 hours")
         print("  - Auto-resume: YES (if interrupted)")
         print("  - Auto-backup: YES (every 500 coasters)")
         print()
@@ -121,10 +123,11 @@ def full_update():
     cmd = [
         sys.executable,  # Use same Python interpreter
         'update_coasters_simple.py',
-        '--start', '1',
-        '--end', '25000',
+        '--discover',
         '--delay', '2.0',
-        '--save-interval', '500'
+        '--min-delay', '1.0',
+        '--save-interval', '500',
+        '--concurrency', '4'
     ]
     
     # Add resume flag if continuing from progress
@@ -0,0 +1,76 @@
+"""
+Custom ID Allocator
+Hands out new custom coaster IDs (C + countryCode + parkCode + 2-digit track) from
+per-park counters built once from the existing IDs
+"""
+
+from typing import Dict, Iterable, List, Optional, Set
+
+from park_resolver import PARK_ID_LENGTH, PLACEHOLDER_COUNTRY_CODE, is_placeholder
+
+MAX_TRACK = 99
+
+# Placeholders are C999 + a 6-digit sequence number (no park in parks.json behind them)
+PLACEHOLDER_DIGITS = 1 + PARK_ID_LENGTH + 2 - 1 - len(PLACEHOLDER_COUNTRY_CODE)
+
+
+class IdAllocator:
+    """
+    Next free track number per parkId, plus the next placeholder number
+
+    Every ID handed out is reserved right away, so IDs are unique within a
+    batch even before the records are inserted. C999 IDs of parks in parks
+    (parks.json) count as park IDs, since 999 is also a real countryCode;
+    only the others are placeholders. The two overlap, so both kinds of
+    allocation also skip every ID seen in use. Each allocation is O(1)
+    amortized.
+    """
+
+    def __init__(self, existing_ids: Iterable[str] = (), parks: Optional[Dict[str, Dict]] = None):
+        self.parks = parks if parks is not None else {}  # parkId -> park (parks.json, kept up to date)
+        self._next_track: Dict[str, int] = {}  # parkId (countryCode + parkCode) -> next track number
+        self._next_placeholder = 1
+        self._used: Set[str] = set()  # Every ID in use or handed out
+        for custom_id in existing_ids:
+            self.observe(custom_id)
+
+    def observe(self, custom_id: str):
+        """Account for an ID that is already in use"""
+        self._used.add(custom_id)
+        digits = custom_id[1:]
+        if not custom_id.startswith('C') or len(digits) != PARK_ID_LENGTH + 2 or not digits.isdigit():
+            return
+        if is_placeholder(custom_id, self.parks):
+            number = int(digits[len(PLACEHOLDER_COUNTRY_CODE):])
+            self._next_placeholder = max(self._next_placeholder, number + 1)
+        else:
+            park_id, track = digits[:PARK_ID_LENGTH], int(digits[PARK_ID_LENGTH:])
+            self._next_track[park_id] = max(self._next_track.get(park_id, 1), track + 1)
+
+    def allocate(self, park_id: str, count: int = 1) -> Optional[List[str]]:
+        """
+        Reserve count consecutive track IDs in a park, all or nothing
+
+        Returns None (reserving nothing) when the park has fewer than count
+        free consecutive track numbers left.
+        """
+        first = self._next_track.get(park_id, 1)
+        while first + count - 1 <= MAX_TRACK:
+            new_ids = [f"C{park_id}{track:02d}" for track in range(first, first + count)]
+            taken = [i for i, custom_id in enumerate(new_ids) if custom_id in self._used]
+            if not taken:
+                self._next_track[park_id] = first + count
+                self._used.update(new_ids)
+                return new_ids
+            first += taken[-1] + 1
+        return None
+
+    def allocate_placeholder(self) -> str:
+        """Reserve the next C999 placeholder ID (never one in use or inside a park of parks.json)"""
+        while True:
+            number = self._next_placeholder
+            self._next_placeholder += 1
+            custom_id = f"C{PLACEHOLDER_COUNTRY_CODE}{number:0{PLACEHOLDER_DIGITS}d}"
+            if custom_id not in self._used and is_placeholder(custom_id, self.parks):
+                self._used.add(custom_id)
+                return custom_id
@@ -0,0 +1,77 @@
+"""
+Typed Stats Migration
+Converts the string stats of existing records in coasters_master.json to numbers in
+canonical units (see units.py), in one pass and without network access
+"""
+
+import argparse
+from collections import Counter
+from pathlib import Path
+
+from database_merger_simple import DatabaseMerger
+from units import DEFAULT_UNITS, METRES_PER_UNIT, migrate_database, needs_migration
+
+
+def migrate_units(assume_units: str = DEFAULT_UNITS, preview: bool = False) -> int:
+    """
+    Normalize every record that still has string stats
+
+    Refuses to run when no record needs it (e.g. a second run), so nothing is
+    ever converted twice.
+
+    Args:
+        assume_units: Units the old string values were scraped in
+        preview: If True, don't save changes
+    """
+    database_dir = Path(__file__).parent.parent.parent / "database" / "data"
+    merger = DatabaseMerger(str(database_dir / "coasters_master.json"),
+                            str(database_dir / "rcdb_to_custom_mapping.json"))
+
+    pending = [custom_id for custom_id, coaster in merger.database.items() if needs_migration(coaster)]
+    if not pending:
+        print("✓ Nothing to migrate: every record is in canonical units already (migration has run)")
+        merger.close()
+        return 0
+
+    merger.mark_dirty(pending)
+    migrated = migrate_database(merger.database, assume_units)
+    units = Counter(coaster.get('sourceUnits') for coaster in merger.database.values())
+
+    print()
+    print(f"✓ Migrated {migrated} of {len(merger.database)} records (read as {assume_units})")
+    for unit, count in units.most_common():
+        print(f"  {unit}: {count}")
+
+    if migrated and not preview:
+        merger.save(backup=True)
+    elif preview:
+        print()
+        print("⚠️  PREVIEW MODE - No changes were saved")
+    merger.close()
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert stored stats to metres, km/h and seconds",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Check how many records would be converted
+  python migrate_units.py --preview
+
+  # Convert, reading old values as feet and mph
+  python migrate_units.py --assume-units imperial
+        """
+    )
+    parser.add_argument('--assume-units', choices=sorted(METRES_PER_UNIT), default=DEFAULT_UNITS,
+                        help=f'Units of the existing string values (default: {DEFAULT_UNITS})')
+    parser.add_argument('--preview', action='store_true',
+                        help='Preview mode - do not save changes')
+    args = parser.parse_args()
+
+    migrate_units(assume_units=args.assume_units, preview=args.preview)
+
+
+if __name__ == "__main__":
+    main()
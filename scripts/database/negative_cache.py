@@ -0,0 +1,95 @@
+"""
+RCDB Negative Cache
+Remembers RCDB IDs that are not coasters we keep (people, parks, manufacturers,
+alpine coasters) or do not exist, so the updaters can skip them until a TTL expires
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+# Next to the page cache (see page_cache.DEFAULT_CACHE_DIR)
+DEFAULT_NEGATIVE_CACHE_PATH = Path(__file__).parent.parent.parent / "database" / "cache" / "negative_ids.json"
+
+NOT_FOUND_REASON = "Not found"
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class NegativeCache:
+    """
+    Persistent store of filtered and missing RCDB IDs
+
+    Each entry holds the filter reason, the RCDB classification (if any) and when
+    the ID was first and last seen that way. Missing IDs get a shorter TTL than
+    filtered ones: new coasters are added to RCDB at fresh IDs, so a missing ID
+    near the end of the range may well exist next week.
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_NEGATIVE_CACHE_PATH,
+                 ttl_days: float = 30, missing_ttl_days: float = 7):
+        self.path = Path(path)
+        self.ttl = timedelta(days=ttl_days)
+        self.missing_ttl = timedelta(days=missing_ttl_days)
+        self.entries: Dict[str, Dict] = {}  # rcdb_id -> {reason, classification, firstSeen, lastSeen}
+        self.skipped = 0  # Requests saved by should_skip this run
+        self.load()
+
+    def load(self):
+        """Load entries from disk"""
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def save(self):
+        """Write entries (to a temp file first, then swapped in)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, rcdb_id: int) -> bool:
+        return str(rcdb_id) in self.entries
+
+    def get(self, rcdb_id: int) -> Optional[Dict]:
+        return self.entries.get(str(rcdb_id))
+
+    def should_skip(self, rcdb_id: int) -> bool:
+        """True if the ID is known to be negative and its entry has not expired"""
+        entry = self.entries.get(str(rcdb_id))
+        if entry is None:
+            return False
+        ttl = self.missing_ttl if entry['reason'] == NOT_FOUND_REASON else self.ttl
+        last_seen = datetime.strptime(entry['lastSeen'], TIMESTAMP_FORMAT)
+        if datetime.now() - last_seen >= ttl:
+            return False
+        self.skipped += 1
+        return True
+
+    def record(self, rcdb_id: int, reason: str, classification: str = ""):
+        """Record (or refresh) a filtered or missing ID"""
+        now = datetime.now().strftime(TIMESTAMP_FORMAT)
+        key = str(rcdb_id)
+        previous = self.entries.get(key)
+        self.entries[key] = {
+            'reason': reason,
+            'classification': classification,
+            'firstSeen': previous['firstSeen'] if previous else now,
+            'lastSeen': now,
+        }
+
+    def touch(self, rcdb_id: int):
+        """Refresh lastSeen, e.g. when the page is unchanged so its outcome is too"""
+        entry = self.entries.get(str(rcdb_id))
+        if entry:
+            entry['lastSeen'] = datetime.now().strftime(TIMESTAMP_FORMAT)
+
+    def forget(self, rcdb_id: int):
+        """Drop an ID that turned out to be a coaster after all"""
+        self.entries.pop(str(rcdb_id), None)
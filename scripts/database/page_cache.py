@@ -0,0 +1,146 @@
+"""
+RCDB Page Cache
+Content-addressed, gzip-compressed store of downloaded RCDB pages
+Lets the scraper send conditional GETs and skip pages whose content is unchanged,
+and leaves a local corpus of pages behind for offline work
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+
+# Project root is three levels up from scripts/database/
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent.parent / "database" / "cache" / "rcdb_pages"
+
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+
+class PageCache:
+    """
+    Page bodies live in objects/<hash[:2]>/<hash>.html.gz, so identical pages are
+    stored once. index.json maps each RCDB ID to the hash of its latest body plus
+    the ETag / Last-Modified validators the server sent with it.
+
+    Index updates are staged until commit(rcdb_id) is called, and save() only
+    writes committed entries. Callers commit an ID once its result has been
+    handled (e.g. added to the batch that is merged before the next save), so a
+    crash can never leave the index claiming a page is up to date when its
+    changes never made it into the database.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path] = DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.index_path = self.cache_dir / "index.json"
+        self.entries: Dict[str, Dict] = {}  # rcdb_id -> {hash, etag, lastModified, fetchedAt}
+        self._staged: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Load the index from disk"""
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def save(self):
+        """Write the committed index (written to a temp file first, then swapped in)"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            entries = dict(self.entries)
+        tmp_path = self.index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[int]:
+        """Cached RCDB IDs (committed entries), ascending"""
+        return iter(sorted(int(rcdb_id) for rcdb_id in self.entries))
+
+    def entry(self, rcdb_id: int) -> Optional[Dict]:
+        """Latest index entry for an ID, staged or committed"""
+        key = str(rcdb_id)
+        with self._lock:
+            return self._staged.get(key) or self.entries.get(key)
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / f"{digest}.html.gz"
+
+    def conditional_headers(self, rcdb_id: int) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a page we hold a copy of"""
+        entry = self.entry(rcdb_id)
+        if not entry or not self._object_path(entry['hash']).exists():
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('lastModified'):
+            headers['If-Modified-Since'] = entry['lastModified']
+        return headers
+
+    def load_page(self, rcdb_id: int) -> Optional[str]:
+        """Cached HTML of a page, or None if it is not in the cache"""
+        entry = self.entry(rcdb_id)
+        if not entry:
+            return None
+        path = self._object_path(entry['hash'])
+        if not path.exists():
+            return None
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return f.read()
+
+    def store(self, rcdb_id: int, html: str, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> bool:
+        """
+        Store a freshly downloaded page
+
+        Returns:
+            True if the content differs from the last stored copy (or is new)
+        """
+        digest = content_hash(html)
+        previous = self.entry(rcdb_id)
+
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Unique temp name: worker threads may store the same body at once
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                f.write(html)
+            os.replace(tmp_path, path)
+
+        self._stage(rcdb_id, {
+            'hash': digest,
+            'etag': etag,
+            'lastModified': last_modified,
+        })
+        return previous is None or previous['hash'] != digest
+
+    def touch(self, rcdb_id: int):
+        """Record that the server confirmed our copy is current (HTTP 304)"""
+        entry = self.entry(rcdb_id)
+        if entry:
+            self._stage(rcdb_id, dict(entry))
+
+    def _stage(self, rcdb_id: int, entry: Dict):
+        entry['fetchedAt'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            self._staged[str(rcdb_id)] = entry
+
+    def commit(self, rcdb_id: int):
+        """Make the staged entry for an ID part of the index written by save()"""
+        key = str(rcdb_id)
+        with self._lock:
+            entry = self._staged.pop(key, None)
+            if entry is not None:
+                self.entries[key] = entry
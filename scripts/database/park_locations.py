@@ -0,0 +1,122 @@
+"""
+RCDB Park Locations
+Fetches the coordinates of every park once (from its RCDB park page), stores them in
+parks.json and rebuilds the park_grid.json spatial index
+"""
+
+import argparse
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+from database_merger_simple import query_coasters
+from park_resolver import ParkResolver
+from rcdb_page import extract_coordinates
+from rcdb_scraper import RCDBScraper, RCDBUnavailableError
+from spatial_index import DEFAULT_CELL_DEGREES, ParkGrid
+
+DATA_DIR = Path(__file__).parent.parent.parent / "database" / "data"
+
+
+def locate_parks(limit: Optional[int] = None, delay: float = 3.0, min_delay: Optional[float] = None,
+                 save_interval: int = 100, preview: bool = False) -> ParkGrid:
+    """
+    Fetch park pages for parks without coordinates, then rebuild the spatial index
+
+    Args:
+        limit: Maximum number of park pages to fetch (default: all missing)
+        delay: Starting delay between requests in seconds
+        min_delay: Shortest delay the adaptive rate may reach (None = delay, no speed-up)
+        save_interval: Save parks.json every N parks
+        preview: If True, don't save changes
+    """
+    parks = ParkResolver(DATA_DIR / "parks.json", DATA_DIR / "countries.json")
+    database_path = DATA_DIR / "coasters_master.json"
+    if database_path.exists() or database_path.with_suffix('.sqlite').exists():
+        parks.index_database(query_coasters(database_path, fields=('rcdbParkId',)))
+
+    missing = list(parks.parks_without_location())
+    if limit is not None:
+        missing = missing[:limit]
+    print(f"✓ {len(parks.parks)} parks, {len(missing)} to locate")
+
+    scraper = RCDBScraper(delay=delay, min_delay=min_delay)
+    located = 0
+    for i, (park_id, rcdb_park_id) in enumerate(missing, 1):
+        try:
+            html = scraper.fetch_html(f"/{rcdb_park_id}.htm")
+        except RCDBUnavailableError as e:
+            print(f"⚠️  {e}")
+            break
+        except requests.RequestException as e:
+            print(f"⚠️  Park {park_id} (RCDB {rcdb_park_id}): {e}")
+            continue
+
+        coordinates = extract_coordinates(html) if html else None
+        parks.set_location(park_id, rcdb_park_id, coordinates)
+        if coordinates:
+            located += 1
+            print(f"✓ {parks.parks[park_id]['name']}: {coordinates[0]:.4f}, {coordinates[1]:.4f}")
+        else:
+            print(f"⚠️  {parks.parks[park_id]['name']}: no map link on RCDB {rcdb_park_id}")
+
+        if i % save_interval == 0 and not preview:
+            parks.save()
+
+    grid = ParkGrid.from_parks(parks.parks)
+    print()
+    print(f"✓ Located {located} of {len(missing)} parks; {len(grid)} parks have coordinates")
+    if preview:
+        print("⚠️  PREVIEW MODE - No changes were saved")
+    else:
+        parks.save()
+        grid.save(DATA_DIR / "park_grid.json")
+        print(f"✓ Saved spatial index: {DATA_DIR / 'park_grid.json'} ({DEFAULT_CELL_DEGREES}° cells)")
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Add park coordinates from RCDB and rebuild the park spatial index",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Locate every park that has no coordinates yet
+  python park_locations.py
+
+  # Locate at most 200 parks
+  python park_locations.py --limit 200
+
+  # Only rebuild park_grid.json from parks.json
+  python park_locations.py --limit 0
+        """
+    )
+    parser.add_argument('--limit', type=int, default=None,
+                        help='Maximum number of park pages to fetch (default: all missing)')
+    parser.add_argument('--delay', type=float, default=3.0,
+                        help='Starting delay between requests in seconds (default: 3.0)')
+    parser.add_argument('--min-delay', type=float, default=None,
+                        help='Let the rate speed up to this delay while RCDB is healthy (default: --delay, no speed-up)')
+    parser.add_argument('--save-interval', type=int, default=100,
+                        help='Save parks.json every N parks (default: 100)')
+    parser.add_argument('--preview', action='store_true',
+                        help='Preview mode - fetch but do not save changes')
+    args = parser.parse_args()
+
+    if args.limit is not None and args.limit < 0:
+        parser.error("--limit must be >= 0")
+    if args.save_interval < 1:
+        parser.error("--save-interval must be >= 1")
+
+    locate_parks(
+        limit=args.limit,
+        delay=args.delay,
+        min_delay=args.min_delay,
+        save_interval=args.save_interval,
+        preview=args.preview
+    )
+
+
+if __name__ == "__main__":
+    main()
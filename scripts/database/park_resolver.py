@@ -0,0 +1,246 @@
+"""
+Park Resolver
+Maps a scraped coaster to its parkId (countryCode + parkCode) from parks.json,
+so new coasters get a real custom ID instead of a C999 placeholder
+"""
+
+import difflib
+import json
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple, Union
+
+from snapshot_cache import load_json, write_snapshot
+
+# Custom coaster IDs: C + countryCode (3) + parkCode (4) + track (2), e.g. C043004901
+PARK_ID_LENGTH = 7
+# Placeholder IDs start with C999, but 999 is also the countryCode of real countries
+# (Cuba, North Korea, Togo, ...): only C999 IDs without a park in parks.json are placeholders
+PLACEHOLDER_COUNTRY_CODE = '999'
+
+# Name similarity (0-1) above which a new park is reported as a possible duplicate
+SIMILAR_PARK_RATIO = 0.8
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+
+def park_name_key(name: str) -> str:
+    """
+    Case-, accent-, punctuation- and word-order-insensitive form of a park name,
+    so "Pleasure Beach Blackpool" and "Blackpool Pleasure Beach" match
+    """
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    words = [word for word in _PUNCTUATION_RE.sub(' ', name.casefold()).split() if word != 'the']
+    return ' '.join(sorted(words))
+
+
+def park_id_of(custom_id: str) -> Optional[str]:
+    """
+    parkId part of a custom coaster ID (None for odd IDs)
+
+    The park need not exist: look it up in parks.json (see is_placeholder).
+    """
+    if len(custom_id) != 1 + PARK_ID_LENGTH + 2 or not custom_id.startswith('C'):
+        return None
+    park_id = custom_id[1:1 + PARK_ID_LENGTH]
+    if not park_id.isdigit():
+        return None
+    return park_id
+
+
+def is_placeholder(custom_id: str, parks: Dict[str, Dict]) -> bool:
+    """A C999 ID with no park in parks (parks.json) behind it"""
+    return custom_id.startswith('C' + PLACEHOLDER_COUNTRY_CODE) and park_id_of(custom_id) not in parks
+
+
+class ParkResolver:
+    """
+    In-memory park indexes, built once per run
+
+    Lookups go by RCDB park ID first (the park link on the coaster page), learned
+    from parks that were located (see park_locations.py) and from existing records
+    that already carry rcdbParkId and a real custom ID, then
+    by (countryCode, park_name_key). Park names that occur twice in one
+    country are ambiguous and never matched by name. Parks that cannot be found
+    are added to parks.json with the next free parkCode of their country and
+    "needsReview": true (listed by validate_database), with a warning when the
+    country already has a park of a similar name; delete the flag once checked.
+    parkCodes taken by placeholder IDs (C999 + a park that is not in parks.json)
+    are never given to new parks, which would otherwise adopt those records.
+    Resolving needs no network requests: everything comes from the coaster page.
+    """
+
+    def __init__(self, parks_path: Union[str, Path], countries_path: Union[str, Path]):
+        self.parks_path = Path(parks_path)
+        self.countries_path = Path(countries_path)
+        self.parks: Dict[str, Dict] = {}  # parkId -> park data
+        self.countries: Dict[str, Dict] = {}  # country name -> country data
+        self.by_rcdb_park: Dict[int, str] = {}  # RCDB park ID -> parkId
+        self.by_name: Dict[Tuple[str, str], Optional[str]] = {}  # (countryCode, name key) -> parkId, None if ambiguous
+        self._next_park_code: Dict[str, int] = {}  # countryCode -> next free parkCode
+        self._reserved: Set[str] = set()  # parkIds of placeholder IDs, never given to a new park
+        self._newlines: Dict[Path, str] = {}  # Line endings of the loaded files, kept on save
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """Load parks.json and countries.json and build the name index"""
+        self.parks = self._read(self.parks_path)
+        self.countries = self._read(self.countries_path)
+
+        for park_id, park in self.parks.items():
+            self._index_park(park_id, park)
+
+    def _read(self, path: Path) -> Dict:
+        if not path.exists():
+            return {}
+        with open(path, 'rb') as f:
+            self._newlines[path] = '\r\n' if f.readline().endswith(b'\r\n') else '\n'
+        return load_json(path, default={})
+
+    def _write(self, path: Path, data: Dict):
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8', newline=self._newlines.get(path, '\n')) as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        write_snapshot(path, data)
+
+    def _index_park(self, park_id: str, park: Dict):
+        key = (park['countryCode'], park_name_key(park['name']))
+        self.by_name[key] = None if key in self.by_name else park_id
+        if park.get('rcdbParkId'):
+            self.by_rcdb_park[int(park['rcdbParkId'])] = park_id
+        code = int(park['parkCode'])
+        if code >= self._next_park_code.get(park['countryCode'], 1):
+            self._next_park_code[park['countryCode']] = code + 1
+
+    def index_database(self, database: Dict[str, Dict]):
+        """Learn RCDB park ID -> parkId from records that have both (and reserve placeholder parkIds)"""
+        for custom_id, coaster in database.items():
+            rcdb_park_id = coaster.get('rcdbParkId')
+            park_id = park_id_of(custom_id)
+            if rcdb_park_id and park_id in self.parks:
+                self.by_rcdb_park.setdefault(int(rcdb_park_id), park_id)
+        self.reserve(database)
+
+    def reserve(self, custom_ids: Iterable[str]):
+        """Keep the parkIds of placeholder IDs from being given to new parks"""
+        for custom_id in custom_ids:
+            if is_placeholder(custom_id, self.parks):
+                self._reserved.add(park_id_of(custom_id))
+
+    def resolve(self, coaster: Dict) -> Optional[str]:
+        """parkId for a scraped coaster, adding the park if needed (None if the country is unknown)"""
+        rcdb_park_id = coaster.get('rcdbParkId')
+        if rcdb_park_id and int(rcdb_park_id) in self.by_rcdb_park:
+            return self.by_rcdb_park[int(rcdb_park_id)]
+
+        country = self.countries.get(coaster.get('country', ''))
+        park_name = coaster.get('parkName', '')
+        if not country or not park_name:
+            return None
+
+        key = (country['code'], park_name_key(park_name))
+        if key in self.by_name:
+            park_id = self.by_name[key]
+            if park_id is None:
+                return None  # Several parks of this name; only the RCDB park ID can tell
+        else:
+            park_id = self._add_park(park_name, country, rcdb_park_id)
+        if rcdb_park_id:
+            self.by_rcdb_park[int(rcdb_park_id)] = park_id
+        return park_id
+
+    def _add_park(self, name: str, country: Dict, rcdb_park_id=None) -> str:
+        country_code = country['code']
+        park_code = self._next_park_code.get(country_code, 1)
+        while f"{country_code}{park_code:04d}" in self._reserved:
+            park_code += 1
+        if park_code > 9999:
+            raise ValueError(f"No parkCode left for country {country['name']}")
+        park_id = f"{country_code}{park_code:04d}"
+        similar = self._similar_park(name, country_code)
+        park = {
+            "parkCode": f"{park_code:04d}",
+            "parkId": park_id,
+            "name": name,
+            "country": country['name'],
+            "countryCode": country_code,
+            "coasterCount": 0,
+            "needsReview": True
+        }
+        if rcdb_park_id:
+            park['rcdbParkId'] = int(rcdb_park_id)
+        self.parks[park_id] = park
+        self._index_park(park_id, park)
+        country['parkCount'] = country.get('parkCount', 0) + 1
+        self._dirty = True
+        if similar:
+            print(f"⚠️  New park: {name} ({country['name']}) → {park_id}, needs review: "
+                  f"similar to {self.parks[similar]['name']} ({similar})")
+        else:
+            print(f"✓ New park: {name} ({country['name']}) → {park_id} (needs review)")
+        return park_id
+
+    def _similar_park(self, name: str, country_code: str) -> Optional[str]:
+        """parkId of the country's park whose name is closest to name, if it is close"""
+        key = park_name_key(name)
+        best_id, best_ratio = None, SIMILAR_PARK_RATIO
+        matcher = difflib.SequenceMatcher(b=key)
+        for park_id, park in self.parks.items():
+            if park['countryCode'] != country_code:
+                continue
+            matcher.set_seq1(park_name_key(park['name']))
+            # Cheap upper bounds first: most parks are nowhere near
+            if matcher.real_quick_ratio() < best_ratio or matcher.quick_ratio() < best_ratio:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= best_ratio:
+                best_id, best_ratio = park_id, ratio
+        return best_id
+
+    def add_coaster(self, park_id: str):
+        """Count a newly added coaster towards its park"""
+        park = self.parks.get(park_id)
+        if park is not None:
+            park['coasterCount'] = park.get('coasterCount', 0) + 1
+            self._dirty = True
+
+    def remove_coaster(self, park_id: str):
+        """Stop counting a removed coaster towards its park"""
+        park = self.parks.get(park_id)
+        if park is not None and park.get('coasterCount', 0) > 0:
+            park['coasterCount'] -= 1
+            self._dirty = True
+
+    def set_location(self, park_id: str, rcdb_park_id: int, coordinates: Optional[Tuple[float, float]]):
+        """
+        Store where a park is (from its RCDB park page). None records that the page
+        has no map link, so the park is not fetched again.
+        """
+        park = self.parks[park_id]
+        park['rcdbParkId'] = rcdb_park_id
+        park['coordinates'] = (
+            {'lat': round(coordinates[0], 6), 'lon': round(coordinates[1], 6)} if coordinates else None
+        )
+        self._dirty = True
+
+    def parks_without_location(self) -> Iterator[Tuple[str, int]]:
+        """(parkId, RCDB park ID) of every park with a known RCDB page that was never located"""
+        for rcdb_park_id, park_id in self.by_rcdb_park.items():
+            park = self.parks.get(park_id)
+            if park is not None and 'coordinates' not in park:
+                yield park_id, rcdb_park_id
+
+    def save(self) -> bool:
+        """Write parks.json and countries.json if anything changed; returns whether they were written"""
+        if not self._dirty:
+            return False
+        self._write(self.parks_path, self.parks)
+        self._write(self.countries_path, self.countries)
+        self._dirty = False
+        print(f"✓ Saved parks: {self.parks_path}")
+        return True
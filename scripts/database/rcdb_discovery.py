@@ -0,0 +1,157 @@
+"""
+RCDB Coaster Discovery
+Builds the set of RCDB IDs worth fetching from RCDB's roller coaster listing pages,
+instead of sweeping every ID from 1 to 25,000, and probes where the ID space ends
+"""
+
+import re
+from itertools import count
+from typing import List, Optional
+
+import requests
+
+from rcdb_scraper import RCDBScraper
+
+# Roller coaster search (every status and location), paginated with &page=N
+LISTING_PATH = "/r.htm?ot=2"
+
+# RCDB has malformed HTML: no closing </tr> tags and unquoted attributes
+_ROW_RE = re.compile(r'<tr[\s>]', re.IGNORECASE)
+_OBJECT_LINK_RE = re.compile(r'href="?/(\d+)\.htm')
+
+
+class DiscoveryError(Exception):
+    """RCDB's listing pages yielded no coasters"""
+
+
+def parse_listing(html: str) -> List[int]:
+    """Coaster IDs on one listing page: the first object link of every result row"""
+    start = html.find('<tbody')
+    body = html[start:] if start >= 0 else html
+    end = body.find('</tbody>')
+    if end >= 0:
+        body = body[:end]
+
+    ids = []
+    for row in _ROW_RE.split(body)[1:]:
+        match = _OBJECT_LINK_RE.search(row)
+        if match:
+            ids.append(int(match.group(1)))
+    return ids
+
+
+class CoasterDiscovery:
+    """
+    Finds candidate coaster IDs with a few hundred listing requests
+
+    Shares the scraper's session, pacing and retries, so discovery requests count
+    against the same rate limit as coaster pages. A request that still fails
+    after the scraper's retries is tried once more, then skipped: a listing page
+    is left out (its coasters wait for the next run) and an end probe counts as
+    a miss. RCDBUnavailableError (RCDB is down) is not caught.
+    """
+
+    def __init__(self, scraper: RCDBScraper, max_pages: int = 5000, probe_window: int = 3,
+                 max_failed_pages: int = 3):
+        self.scraper = scraper
+        self.max_pages = max_pages
+        self.probe_window = probe_window  # Consecutive IDs checked before calling an ID range empty
+        self.max_failed_pages = max_failed_pages  # Consecutive failed listing pages before giving up
+        self.requests = 0
+        self.failed_pages: List[int] = []
+
+    def _fetch(self, path: str) -> Optional[str]:
+        """fetch_html with one more try; raises requests.RequestException if both fail"""
+        for attempt in range(2):
+            self.requests += 1
+            try:
+                return self.scraper.fetch_html(path)
+            except requests.RequestException as e:
+                if attempt:
+                    raise
+                print(f"⚠️  {path}: {e} (trying again)")
+
+    def listed_ids(self) -> List[int]:
+        """Every coaster ID on the listing pages, ascending"""
+        seen = set()
+        failed_in_a_row = 0
+        for page in count(1):
+            if page > self.max_pages:
+                print(f"⚠️  Stopped listing after {self.max_pages} pages")
+                break
+            try:
+                html = self._fetch(f"{LISTING_PATH}&page={page}")
+            except requests.RequestException as e:
+                print(f"⚠️  Listing page {page} skipped: {e}")
+                self.failed_pages.append(page)
+                failed_in_a_row += 1
+                if failed_in_a_row >= self.max_failed_pages:
+                    print(f"⚠️  Stopped listing after {failed_in_a_row} failed pages in a row")
+                    break
+                continue
+            failed_in_a_row = 0
+            new_ids = set(parse_listing(html)) - seen if html else set()
+            # Past the last page RCDB shows an empty (or repeated) page
+            if not new_ids:
+                break
+            seen.update(new_ids)
+            if page % 50 == 0:
+                print(f"  Listing page {page}: {len(seen)} coasters so far")
+        return sorted(seen)
+
+    def _exists(self, rcdb_id: int) -> bool:
+        """Any RCDB object (coaster, park, person, ...) lives at this ID"""
+        try:
+            html = self._fetch(f"/{rcdb_id}.htm")
+        except requests.RequestException as e:
+            print(f"⚠️  End probe at RCDB {rcdb_id} counted as a miss: {e}")
+            return False
+        return html is not None and "not a valid" not in html.lower()
+
+    def _any_exists(self, rcdb_id: int) -> bool:
+        # IDs of deleted objects leave small gaps, so look at a few neighbours
+        return any(self._exists(rcdb_id + offset) for offset in range(self.probe_window))
+
+    def find_end(self, known_id: int) -> int:
+        """
+        Upper bound of the used ID space, starting from an ID known to exist
+
+        Doubles the step until it lands past the end, then binary searches the
+        last gap: O(log n) probes instead of walking into 150 misses.
+        """
+        low = known_id
+        step = 64
+        while self._any_exists(low + step):
+            low += step
+            step *= 2
+        high = low + step
+
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self._any_exists(middle):
+                low = middle
+            else:
+                high = middle
+
+        # Something exists in [low, low + probe_window)
+        return low + self.probe_window - 1
+
+    def candidate_ids(self) -> List[int]:
+        """
+        Listed coaster IDs, plus every ID between the highest listed one and the
+        end of the ID space (coasters added after the listing was read, and a few
+        new parks or people that the negative cache will remember)
+        """
+        print("Discovering coaster IDs from RCDB listing pages...")
+        listed = self.listed_ids()
+        if not listed:
+            raise DiscoveryError("RCDB listing pages returned no coasters")
+
+        end = max(self.find_end(listed[-1]), listed[-1])
+        candidates = listed + list(range(listed[-1] + 1, end + 1))
+        print(f"✓ {len(listed)} listed coasters, ID space ends near {end}: "
+              f"{len(candidates)} candidates ({self.requests} discovery requests)")
+        if self.failed_pages:
+            print(f"⚠️  {len(self.failed_pages)} listing pages failed ({self.failed_pages}); "
+                  f"their coasters are left for the next run")
+        return candidates
@@ -0,0 +1,294 @@
+"""
+RCDB Page Index
+Collects everything the scraper's extractors need from an RCDB page in one pass,
+so each extractor reads a small list instead of re-walking the whole document.
+Also holds the single-scan stats and tracks table extractors.
+"""
+
+import html as html_lib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+from bs4 import BeautifulSoup, NavigableString
+
+
+# How much of the page text holds the status line (see RCDBScraper._extract_status)
+HEADER_LENGTH = 2000
+
+# Stats table rows that map onto coaster fields: lower-cased <th> label -> field name
+STAT_FIELDS = {
+    'height': 'height',
+    'drop': 'drop',
+    'angle': 'angle',
+    'vertical angle': 'verticalAngle',
+    'speed': 'speed',
+    'length': 'length',
+    'inversions': 'inversions',
+}
+
+# RCDB has malformed HTML: no closing </tr> tags and UNQUOTED attributes,
+# e.g. <th>Height<td><span class=float>213</span> ft (class=float, not class="float")
+_ROW_RE = re.compile(r'<th>([^<]*)<td>', re.IGNORECASE)
+_FLOAT_RE = re.compile(r'<span class=float>([^<]+)</span>', re.IGNORECASE)
+_INTEGER_RE = re.compile(r'\d+')
+_DURATION_RE = re.compile(r'\d+:\d+')
+_ELEMENTS_END_RE = re.compile(r'<tr>|</td>', re.IGNORECASE)
+_CELL_END_RE = re.compile(r'<t[rdh][\s>]|</t[rd]>|</t(?:able|body)>', re.IGNORECASE)
+_ELEMENT_LINK_RE = re.compile(r'<a href="?/g\.htm\?id=(\d+)[^>]*>([^<]+)</a>', re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]*>')
+
+# Split (dueling/racing) coasters have a Tracks table with one <td> column per track
+_TRACKS_TABLE_RE = re.compile(r'<h3>Tracks</h3><table[^>]*>(.*?)(?:</section>|<section>)',
+                              re.IGNORECASE | re.DOTALL)
+_TABLE_CELL_RE = re.compile(r'<(t[rhd])(?:\s[^>]*)?>', re.IGNORECASE)
+_NUMBER_RE = re.compile(r'[\d.]+')
+
+# Map links on park and coaster pages, e.g. maps.google.com/maps?q=53.7906,-3.0556
+_MAP_LINK_RE = re.compile(r'maps[^"\'>\s]*?[?&;](?:q|ll|query)=(-?\d{1,2}(?:\.\d+)?)(?:,|%2C)\s*(-?\d{1,3}(?:\.\d+)?)',
+                          re.IGNORECASE)
+
+
+# Elements row: (RCDB element ID, name) per g.htm?id= link, in page order
+ElementList = List[Tuple[int, str]]
+
+
+@dataclass
+class PageFacts:
+    """Pre-extracted facts of one RCDB page, in document order"""
+
+    name: str = ""  # Text of the first <h1>
+    text: str = ""  # Full page text (soup.get_text())
+    g_links: List[str] = field(default_factory=list)  # g.htm?id= links: classification, type, design
+    location_links: List[str] = field(default_factory=list)  # location.htm?id= links: city ... country
+    park_links: List[str] = field(default_factory=list)  # /<digits>.htm links: park, make, ...
+    park_ids: List[int] = field(default_factory=list)  # RCDB IDs of those links, same order
+    make_links: List[str] = field(default_factory=list)  # First link of each <p> containing "Make:"
+    model_links: List[List[str]] = field(default_factory=list)  # Links after "Model:", per <p>
+
+    @property
+    def header(self) -> str:
+        return self.text[:HEADER_LENGTH]
+
+
+def is_park_href(href: str) -> bool:
+    return href[0] == '/' and href.endswith('.htm') and href[1:].replace('.htm', '').isdecimal()
+
+
+def park_href_id(href: str) -> int:
+    """RCDB ID of a link accepted by is_park_href"""
+    return int(href[1:].replace('.htm', ''))
+
+
+def _links_after_marker(paragraph, marker: str) -> List[str]:
+    """Texts of the links that follow `marker` inside paragraph, up to a repeated marker"""
+    links = []
+    seen = False
+    for node in paragraph.descendants:
+        if isinstance(node, NavigableString):
+            if marker in node:
+                if seen:
+                    break
+                seen = True
+        elif seen and node.name == 'a':
+            links.append(node.get_text(strip=True))
+    return links
+
+
+def index_soup(soup: BeautifulSoup) -> PageFacts:
+    """Build PageFacts from a parsed page with a single walk over its h1/a/p tags"""
+    facts = PageFacts(text=soup.get_text())
+    found_name = False
+
+    for tag in soup.find_all(['h1', 'a', 'p']):
+        if tag.name == 'a':
+            href = tag.get('href')
+            if not href:
+                continue
+            if 'g.htm?id=' in href:
+                facts.g_links.append(tag.get_text(strip=True))
+            if 'location.htm?id=' in href:
+                facts.location_links.append(tag.get_text(strip=True))
+            if is_park_href(href):
+                facts.park_links.append(tag.get_text(strip=True))
+                facts.park_ids.append(park_href_id(href))
+        elif tag.name == 'p':
+            p_text = tag.get_text()
+            if 'Make:' in p_text:
+                link = tag.find('a')
+                if link:
+                    facts.make_links.append(link.get_text(strip=True))
+            if 'Model:' in p_text:
+                facts.model_links.append(_links_after_marker(tag, 'Model:'))
+        elif not found_name:
+            facts.name = tag.get_text(strip=True)
+            found_name = True
+
+    return facts
+
+
+def _cell_text(html: str, pos: int) -> str:
+    """Plain text of the table cell starting at pos"""
+    end = _CELL_END_RE.search(html, pos)
+    cell = html[pos:end.start() if end else len(html)]
+    return ' '.join(html_lib.unescape(_TAG_RE.sub(' ', cell)).split())
+
+
+def _element_links(html: str, start: int = 0, end: Optional[int] = None) -> ElementList:
+    end = len(html) if end is None else end
+    return [(int(element_id), html_lib.unescape(name).strip())
+            for element_id, name in _ELEMENT_LINK_RE.findall(html, start, end)]
+
+
+def extract_stats(html: str) -> Dict[str, Union[str, ElementList]]:
+    """
+    Extract every <th>Label<td>value row of a page in a single scan
+    
+    Returns one dict with:
+      - the STAT_FIELDS fields ("height", "verticalAngle", ...): the first
+        <span class=float> value for that label, else the first leading integer
+      - "duration": the first m:ss value
+      - "elements": (element ID, name) of every link in the first Elements row
+      - every other row under its page label (e.g. "Capacity"), as plain text
+    Known fields are always present ("" or [] when the page has no value).
+    """
+    numbers: Dict[str, str] = {}
+    integers: Dict[str, str] = {}
+    duration = None
+    elements = None
+    extra: Dict[str, str] = {}
+    
+    for row in _ROW_RE.finditer(html):
+        label = row.group(1)
+        key = label.lower()
+        pos = row.end()
+        
+        field_name = STAT_FIELDS.get(key)
+        if field_name:
+            if field_name not in numbers:
+                match = _FLOAT_RE.match(html, pos)
+                if match:
+                    numbers[field_name] = match.group(1)
+            if field_name not in integers:
+                match = _INTEGER_RE.match(html, pos)
+                if match:
+                    integers[field_name] = match.group(0)
+        elif key == 'duration':
+            if duration is None:
+                match = _DURATION_RE.match(html, pos)
+                if match:
+                    duration = match.group(0)
+        elif key == 'elements':
+            if elements is None:
+                end = _ELEMENTS_END_RE.search(html, pos)
+                elements = _element_links(html, pos, end.start()) if end else []
+        else:
+            label = label.strip()
+            if label and label not in extra:
+                extra[label] = _cell_text(html, pos)
+    
+    stats = {
+        field_name: numbers.get(field_name) or integers.get(field_name) or ""
+        for field_name in STAT_FIELDS.values()
+    }
+    stats['duration'] = duration or ""
+    stats['elements'] = elements or []
+    stats.update(extra)
+    return stats
+
+
+def extract_coordinates(html: str) -> Optional[Tuple[float, float]]:
+    """(latitude, longitude) of the first map link on a page, None if there is none"""
+    for match in _MAP_LINK_RE.finditer(html):
+        latitude, longitude = float(match.group(1)), float(match.group(2))
+        if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+            return latitude, longitude
+    return None
+
+
+def _text(cell: str) -> str:
+    return ' '.join(html_lib.unescape(_TAG_RE.sub(' ', cell)).split())
+
+
+def parse_tracks_table(table_html: str) -> List[Tuple[str, List[str]]]:
+    """
+    Split a table into (<th> label, [<td> HTML, ...]) rows in a single scan
+
+    Works without closing </tr>/</td> tags: every cell runs up to the next
+    <tr>, <th> or <td>.
+    """
+    rows: List[Tuple[str, List[str]]] = []
+    label = ""
+    cells: List[str] = []
+    marks = list(_TABLE_CELL_RE.finditer(table_html))
+    for index, mark in enumerate(marks):
+        tag = mark.group(1).lower()
+        if tag == 'tr':
+            if label or cells:
+                rows.append((label, cells))
+            label, cells = "", []
+            continue
+        end = marks[index + 1].start() if index + 1 < len(marks) else len(table_html)
+        cell = table_html[mark.end():end]
+        if tag == 'th':
+            label = _text(cell)
+        else:
+            cells.append(cell)
+    if label or cells:
+        rows.append((label, cells))
+    return rows
+
+
+def _track_value(key: str, cell: str) -> Union[str, ElementList]:
+    if key == 'elements':
+        return _element_links(cell)
+    if key == 'duration':
+        match = _DURATION_RE.match(cell.strip())
+        return match.group(0) if match else ""
+    match = _FLOAT_RE.search(cell) or _NUMBER_RE.match(cell.strip())
+    return match.group(match.lastindex or 0) if match else ""
+
+
+def extract_track_stats(html: str) -> Optional[List[Tuple[str, Dict[str, Union[str, ElementList]]]]]:
+    """
+    Extract every track of a split coaster's Tracks table in a single scan
+
+    Returns (track name, stats) per column of the Name row, or None when the page
+    has no Tracks table with at least two names. Stats hold the same keys as
+    extract_stats: the STAT_FIELDS fields plus "duration" and "elements" (always
+    present, empty when the track has no value) and every other row as plain text.
+    """
+    match = _TRACKS_TABLE_RE.search(html)
+    if not match:
+        return None
+    rows = parse_tracks_table(match.group(1))
+
+    names = next((cells for label, cells in rows if label.lower() == 'name'), [])
+    names = [_text(cell) for cell in names]
+    if len(names) < 2:
+        return None
+
+    tracks = []
+    for _ in names:
+        stats = {field_name: "" for field_name in STAT_FIELDS.values()}
+        stats['duration'] = ""
+        stats['elements'] = []
+        tracks.append(stats)
+
+    for label, cells in rows:
+        key = label.lower()
+        if key == 'name' or not label:
+            continue
+        field_name = STAT_FIELDS.get(key)
+        # Rows with fewer cells than tracks leave the last tracks without a value
+        for stats, cell in zip(tracks, cells):
+            if field_name:
+                if not stats[field_name]:
+                    stats[field_name] = _track_value(field_name, cell)
+            elif key in ('duration', 'elements'):
+                if not stats[key]:
+                    stats[key] = _track_value(key, cell)
+            elif label not in stats:
+                stats[label] = _text(cell)
+
+    return list(zip(names, tracks))
@@ -0,0 +1,415 @@
+"""
+RCDB Streaming Tokenizer
+Builds PageFacts straight from the raw HTML text, without building a DOM tree.
+
+RCDB pages are malformed (unquoted attributes, no closing </tr> or </p>), so the
+tokenizer deliberately mirrors how BeautifulSoup's 'html.parser' backend reads
+them: the same tag/attribute/comment rules as the standard library HTMLParser,
+unclosed tags that nest, end tags that pop back to the most recent open tag of
+that name, whitespace-only strings collapsed to ' ' or '\\n', and no page text
+from <script>/<style>/<template>/<rt>/<rp>. The result must be identical to
+rcdb_page.index_soup; benchmark_parser.py --backends checks that on saved pages.
+"""
+
+import re
+from html import unescape
+from html.entities import html5
+from typing import List, Optional
+
+from rcdb_page import PageFacts, is_park_href, park_href_id
+
+
+# Tags html.parser/BeautifulSoup close immediately (a later </br> is ignored)
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr',
+    'image', 'img', 'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid',
+    'param', 'source', 'spacer', 'track', 'wbr'
+])
+# Strings inside these tags are not part of the page text
+STRING_CONTAINERS = frozenset(['rt', 'rp', 'style', 'script', 'template'])
+PRESERVE_WHITESPACE = frozenset(['pre', 'textarea'])
+# Raw text elements: everything up to the matching end tag is data
+CDATA_ELEMENTS = frozenset(['script', 'style'])
+TRACKED_TAGS = frozenset(['a', 'p', 'h1'])
+ASCII_SPACES = ' \n\t\x0c\r'
+
+# Same tag and attribute grammar as the standard library HTMLParser
+_START_TAG_OPEN_RE = re.compile(r'<[a-zA-Z]')
+_TAG_NAME_RE = re.compile(r'([a-zA-Z][^\t\n\r\f />\x00]*)(?:\s|/(?!>))*')
+_ATTR_RE = re.compile(
+    r'((?<=[\'"\s/])[^\s/>][^\s/=>]*)(\s*=+\s*'
+    r'(\'[^\']*\'|"[^"]*"|(?![\'"])[^>\s]*))?(?:\s|/(?!>))*')
+_START_TAG_END_RE = re.compile(r"""
+  <[a-zA-Z][^\t\n\r\f />\x00]*
+  (?:[\s/]*
+    (?:(?<=['"\s/])[^\s/>][^\s/=>]*
+      (?:\s*=+\s*
+        (?:'[^']*'
+          |"[^"]*"
+          |(?!['"])[^>\s]*
+         )
+        \s*
+       )?(?:\s|/(?!>))*
+     )*
+   )?
+  \s*
+""", re.VERBOSE)
+_END_TAG_RE = re.compile(r'</\s*([a-zA-Z][-.a-zA-Z0-9:_]*)\s*>')
+_COMMENT_CLOSE_RE = re.compile(r'--\s*>')
+_MARKED_SECTION_CLOSE_RE = re.compile(r']\s*]\s*>')
+_CDATA_END_RE = {name: re.compile(r'</\s*%s\s*>' % name, re.IGNORECASE) for name in CDATA_ELEMENTS}
+_INTERESTING_RE = re.compile('[&<]')
+_CHARREF_RE = re.compile('&#(?:[0-9]+|[xX][0-9a-fA-F]+)[^0-9a-fA-F]')
+_ENTITYREF_RE = re.compile('&([a-zA-Z][-.a-zA-Z0-9]*)[^a-zA-Z0-9]')
+_INCOMPLETE_REF_RE = re.compile('&[a-zA-Z#]')
+
+# Named references BeautifulSoup resolves (&amp; &eacute; ...); unknown ones stay literal
+ENTITIES = {name[:-1]: char for name, char in html5.items() if name.endswith(';')}
+
+MODEL_MARKER = 'Model:'
+
+
+class _Element:
+    """An <a>, <p> or <h1> being tracked; start/end index into the page's text nodes"""
+
+    __slots__ = ('name', 'start', 'end', 'href', 'first_link', 'model_state', 'model_links')
+
+    def __init__(self, name: str, start: int, href: Optional[str] = None):
+        self.name = name
+        self.start = start
+        self.end = -1
+        self.href = href
+        self.first_link: Optional['_Element'] = None
+        self.model_state = 0  # 0: no "Model:" yet, 1: collecting links, 2: stopped
+        self.model_links: List['_Element'] = []
+
+
+class _PageTokenizer:
+    """Single forward pass over one page; see index_html"""
+
+    def __init__(self, html: str):
+        self.html = html
+        self.nodes: List[str] = []  # Text nodes that count as page text
+        self.pending: List[str] = []  # Data not yet turned into a node
+        self.stack: List[tuple] = []  # (tag name, _Element or None)
+        self.open_counts = {}
+        self.container_depth = 0
+        self.preserve_depth = 0
+        self.already_closed: List[str] = []
+        self.elements: List[_Element] = []  # Tracked elements in start order
+
+    # -- tree events (mirroring BeautifulSoup's tree builder) --------------
+
+    def _flush(self, page_text: bool = True):
+        """Turn pending data into a string node; page_text=False for comments etc."""
+        if not self.pending:
+            return
+        data = ''.join(self.pending)
+        self.pending = []
+        if not self.preserve_depth and not data.strip(ASCII_SPACES):
+            data = '\n' if '\n' in data else ' '
+        if MODEL_MARKER in data:
+            for _, element in self.stack:
+                if element is not None and element.name == 'p' and element.model_state < 2:
+                    element.model_state += 1
+        if page_text and not self.container_depth:
+            self.nodes.append(data)
+
+    def _start(self, name: str, href: Optional[str]):
+        self._flush()
+        element = None
+        if name in TRACKED_TAGS:
+            element = _Element(name, len(self.nodes), href)
+            self.elements.append(element)
+            if name == 'a':
+                for _, parent in self.stack:
+                    if parent is not None and parent.name == 'p':
+                        if parent.first_link is None:
+                            parent.first_link = element
+                        if parent.model_state == 1:
+                            parent.model_links.append(element)
+        self.stack.append((name, element))
+        self.open_counts[name] = self.open_counts.get(name, 0) + 1
+        if name in STRING_CONTAINERS:
+            self.container_depth += 1
+        if name in PRESERVE_WHITESPACE:
+            self.preserve_depth += 1
+
+    def _pop(self):
+        name, element = self.stack.pop()
+        self.open_counts[name] -= 1
+        if name in STRING_CONTAINERS:
+            self.container_depth -= 1
+        if name in PRESERVE_WHITESPACE:
+            self.preserve_depth -= 1
+        if element is not None:
+            element.end = len(self.nodes)
+
+    def _end(self, name: str, check_already_closed: bool = True):
+        if check_already_closed and name in self.already_closed:
+            # Redundant end tag of a void element, e.g. the </br> in <br></br>
+            self.already_closed.remove(name)
+            return
+        self._flush()
+        if not self.open_counts.get(name):
+            return
+        while self.stack:
+            popped = self.stack[-1][0]
+            self._pop()
+            if popped == name:
+                break
+
+    def _special(self, data: str, page_text: bool):
+        """Comment, declaration, processing instruction or CDATA section"""
+        self._flush()
+        self.pending.append(data)
+        self._flush(page_text)
+
+    # -- tokenizer ----------------------------------------------------------
+
+    def _data(self, start: int, end: int):
+        if start < end:
+            self.pending.append(self.html[start:end])
+
+    @staticmethod
+    def _numeric_reference(name: str) -> str:
+        number = int(name[1:], 16) if name[:1] in 'xX' else int(name)
+        if number == 0 or number > 0x10ffff or 0xd800 <= number <= 0xdfff:
+            return '\ufffd'
+        if 0x80 <= number <= 0x9f:
+            # Windows-1252 bytes written as references, e.g. &#150; for an en dash
+            try:
+                return bytes([number]).decode('cp1252')
+            except UnicodeDecodeError:
+                pass
+        return chr(number)
+
+    def _incomplete(self, i: int) -> int:
+        """What HTMLParser does with an unterminated construct at the end of input"""
+        html = self.html
+        k = html.find('>', i + 1)
+        if k < 0:
+            k = html.find('<', i + 1)
+            if k < 0:
+                k = i + 1
+        else:
+            k += 1
+        self._data(i, k)
+        return k
+
+    def _start_tag(self, i: int) -> int:
+        html = self.html
+        match = _START_TAG_END_RE.match(html, i)
+        j = match.end()
+        following = html[j:j + 1]
+        if following == '>':
+            endpos = j + 1
+        elif following == '/' and html.startswith('/>', j):
+            endpos = j + 2
+        elif following in ('', '/') or following in ('abcdefghijklmnopqrstuvwxyz=/'
+                                              'ABCDEFGHIJKLMNOPQRSTUVWXYZ'):
+            return -1
+        else:
+            endpos = j if j > i else i + 1
+
+        name_match = _TAG_NAME_RE.match(html, i + 1)
+        k = name_match.end()
+        name = name_match.group(1).lower()
+        href = None
+        while k < endpos:
+            attr = _ATTR_RE.match(html, k)
+            if not attr:
+                break
+            attr_name, rest, value = attr.group(1, 2, 3)
+            if attr_name.lower() == 'href':
+                if not rest:
+                    value = ''
+                elif value[:1] == '\'' == value[-1:] or value[:1] == '"' == value[-1:]:
+                    value = value[1:-1]
+                href = unescape(value) if value else ''
+            k = attr.end()
+
+        end = html[k:endpos].strip()
+        if end not in ('>', '/>'):
+            self._data(i, endpos)
+            return endpos
+
+        self._start(name, href if name == 'a' else None)
+        if end.endswith('/>'):
+            self._end(name, check_already_closed=False)
+        elif name in VOID_ELEMENTS:
+            self._end(name, check_already_closed=False)
+            self.already_closed.append(name)
+        elif name in CDATA_ELEMENTS:
+            return self._raw_text(name, endpos)
+        return endpos
+
+    def _raw_text(self, name: str, i: int) -> int:
+        """Contents of <script>/<style> up to the matching end tag"""
+        match = _CDATA_END_RE[name].search(self.html, i)
+        if not match:
+            # html.parser drops an unterminated raw text element entirely
+            return len(self.html)
+        self._data(i, match.start())
+        self._end(name)
+        return match.end()
+
+    def _end_tag(self, i: int) -> int:
+        html = self.html
+        gtpos = html.find('>', i + 1)
+        if gtpos < 0:
+            return -1
+        match = _END_TAG_RE.match(html, i)
+        if match:
+            self._end(match.group(1).lower())
+            return match.end()
+        name_match = _TAG_NAME_RE.match(html, i + 2)
+        if not name_match:
+            if html.startswith('</>', i):
+                return i + 3
+            self._special(html[i + 2:gtpos], page_text=False)  # Bogus comment
+            return gtpos + 1
+        self._end(name_match.group(1).lower())
+        return html.find('>', name_match.end()) + 1
+
+    def _declaration(self, i: int) -> int:
+        html = self.html
+        if html.startswith('<!--', i):
+            match = _COMMENT_CLOSE_RE.search(html, i + 4)
+            if not match:
+                return -1
+            self._special(html[i + 4:match.start()], page_text=False)
+            return match.end()
+        if html.startswith('<![', i):
+            match = _MARKED_SECTION_CLOSE_RE.search(html, i + 3)
+            if not match:
+                return -1
+            data = html[i + 3:match.start()]
+            is_cdata = data.upper().startswith('CDATA[')
+            self._special(data[6:] if is_cdata else data, page_text=is_cdata)
+            return match.end()
+        gtpos = html.find('>', i + 2)
+        if gtpos < 0:
+            return -1
+        if html[i:i + 9].lower() == '<!doctype':
+            self._special(html[i + 10:gtpos], page_text=False)
+        else:
+            self._special(html[i + 2:gtpos], page_text=False)  # Bogus comment
+        return gtpos + 1
+
+    def _markup(self, i: int) -> int:
+        """Handle the construct starting with '<' at i; returns its end, or -1 if unterminated"""
+        html = self.html
+        if _START_TAG_OPEN_RE.match(html, i):
+            return self._start_tag(i)
+        if html.startswith('</', i):
+            return self._end_tag(i)
+        if html.startswith('<?', i):
+            gtpos = html.find('>', i + 2)
+            if gtpos < 0:
+                return -1
+            self._special(html[i + 2:gtpos], page_text=False)
+            return gtpos + 1
+        if html.startswith('<!', i):
+            return self._declaration(i)
+        self._data(i, i + 1)
+        return i + 1
+
+    def run(self) -> PageFacts:
+        html = self.html
+        n = len(html)
+        i = 0
+        # BeautifulSoup feeds the page to HTMLParser and then closes it. A few
+        # malformed constructs stop the feed pass and are handled differently by
+        # the close pass; `closing` tracks which pass we are emulating.
+        closing = False
+        while i < n:
+            match = _INTERESTING_RE.search(html, i)
+            j = match.start() if match else n
+            self._data(i, j)
+            i = j
+            if i == n:
+                break
+
+            if html[i] == '<':
+                k = self._markup(i)
+                if k < 0:
+                    closing = True
+                    k = self._incomplete(i)
+                i = k
+            elif html.startswith('&#', i):
+                match = _CHARREF_RE.match(html, i)
+                if match:
+                    self.pending.append(self._numeric_reference(match.group()[2:-1]))
+                    i = match.end() if html[match.end() - 1] == ';' else match.end() - 1
+                    continue
+                if html.find(';', i) >= 0:
+                    self._data(i, i + 2)
+                    i += 2
+                if closing:
+                    # html.parser gives up here: the rest of the page is plain text
+                    self._data(i, n)
+                    break
+                closing = True
+            else:
+                match = _ENTITYREF_RE.match(html, i)
+                if match:
+                    name = match.group(1)
+                    self.pending.append(ENTITIES.get(name, '&' + name))
+                    i = match.end() if html[match.end() - 1] == ';' else match.end() - 1
+                    continue
+                match = _INCOMPLETE_REF_RE.match(html, i)
+                if match:
+                    if closing:
+                        if match.group() == html[i:]:
+                            i += 1
+                        self._data(i, n)
+                        break
+                    closing = True
+                    continue
+                self._data(i, i + 1)
+                i += 1
+
+        self._flush()
+        while self.stack:
+            self._pop()
+        return self._facts()
+
+    # -- result ---------------------------------------------------------------
+
+    def _text(self, element: _Element) -> str:
+        return ''.join(self.nodes[element.start:element.end])
+
+    def _stripped_text(self, element: _Element) -> str:
+        return ''.join(node.strip() for node in self.nodes[element.start:element.end])
+
+    def _facts(self) -> PageFacts:
+        facts = PageFacts(text=''.join(self.nodes))
+        found_name = False
+        for element in self.elements:
+            if element.name == 'a':
+                href = element.href
+                if not href:
+                    continue
+                if 'g.htm?id=' in href:
+                    facts.g_links.append(self._stripped_text(element))
+                if 'location.htm?id=' in href:
+                    facts.location_links.append(self._stripped_text(element))
+                if is_park_href(href):
+                    facts.park_links.append(self._stripped_text(element))
+                    facts.park_ids.append(park_href_id(href))
+            elif element.name == 'p':
+                p_text = self._text(element)
+                if 'Make:' in p_text and element.first_link is not None:
+                    facts.make_links.append(self._stripped_text(element.first_link))
+                if MODEL_MARKER in p_text:
+                    facts.model_links.append([self._stripped_text(a) for a in element.model_links])
+            elif not found_name:
+                facts.name = self._stripped_text(element)
+                found_name = True
+        return facts
+
+
+def index_html(html: str) -> PageFacts:
+    """Build PageFacts from raw RCDB HTML with a single streaming pass"""
+    return _PageTokenizer(html).run()
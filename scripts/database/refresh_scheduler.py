@@ -0,0 +1,173 @@
+"""
+RCDB Refresh Scheduler
+Refreshes the records most likely to be out of date first, within a request budget,
+instead of re-crawling everything
+"""
+
+import argparse
+import heapq
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from database_merger_simple import TIMESTAMP_FORMAT, query_coasters
+from rcdb_scraper import RCDBScraper
+from update_coasters_simple import update_database
+
+# Days between refreshes per status: coasters being built or standing but not
+# operating change often, removed ones hardly ever
+REFRESH_INTERVAL_DAYS = {
+    'Under Construction': 7,
+    'SBNO': 14,
+    'Operating': 60,
+    'Removed': 365,
+}
+DEFAULT_INTERVAL_DAYS = 60
+
+# Object statuses ({'state': 'operating', ...}) name their state in lowercase
+_INTERVAL_BY_STATE = {status.lower(): days for status, days in REFRESH_INTERVAL_DAYS.items()}
+
+# Records that changed this recently are refreshed twice as often
+RECENT_CHANGE_DAYS = 30
+
+# Age assumed for records that were never scraped with timestamps
+NEVER_SCRAPED_AGE_DAYS = 10 * 365
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def status_name(status) -> str:
+    """A record's status as a string, unwrapping status objects ({'state': ...})"""
+    if isinstance(status, dict):
+        status = status.get('state')
+    return str(status) if status else 'Unknown'
+
+
+def refresh_priority(coaster: Dict, now: datetime) -> float:
+    """Days since lastScraped divided by the record's refresh interval (>= 1 means due)"""
+    interval = _INTERVAL_BY_STATE.get(status_name(coaster.get('status')).lower(), DEFAULT_INTERVAL_DAYS)
+
+    last_changed = _parse_timestamp(coaster.get('lastChanged'))
+    if last_changed and now - last_changed < timedelta(days=RECENT_CHANGE_DAYS):
+        interval /= 2
+
+    last_scraped = _parse_timestamp(coaster.get('lastScraped'))
+    if last_scraped:
+        age = (now - last_scraped).total_seconds() / 86400
+    else:
+        age = NEVER_SCRAPED_AGE_DAYS
+    return age / interval
+
+
+def build_refresh_queue(database: Dict[str, Dict], budget: int,
+                        now: Optional[datetime] = None) -> List[int]:
+    """
+    RCDB IDs of the `budget` most overdue records, most overdue first
+
+    Split tracks share one RCDB page, so each ID takes the priority of its most
+    overdue track. Records that are not due yet are left out.
+    """
+    now = now or datetime.now()
+    priorities: Dict[int, float] = {}
+    for coaster in database.values():
+        rcdb_id = coaster.get('rcdbId')
+        if not rcdb_id:
+            continue
+        rcdb_id = int(rcdb_id)
+        priority = refresh_priority(coaster, now)
+        if priority > priorities.get(rcdb_id, 0.0):
+            priorities[rcdb_id] = priority
+
+    heap = [(-priority, rcdb_id) for rcdb_id, priority in priorities.items() if priority >= 1]
+    heapq.heapify(heap)
+    return [heapq.heappop(heap)[1] for _ in range(min(budget, len(heap)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Refresh the most out-of-date coasters within a request budget",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Nightly run: one hour of requests
+  python refresh_scheduler.py --minutes 60
+
+  # Show what would be refreshed, without fetching anything
+  python refresh_scheduler.py --budget 500 --dry-run
+        """
+    )
+    budget_group = parser.add_mutually_exclusive_group(required=True)
+    budget_group.add_argument('--budget', type=int, help='Maximum number of pages to fetch')
+    budget_group.add_argument('--minutes', type=float,
+                              help='Time budget; converted to pages at the starting --delay')
+    parser.add_argument('--delay', type=float, default=3.0,
+                        help='Starting delay between requests in seconds (default: 3.0)')
+    parser.add_argument('--min-delay', type=float, default=None,
+                        help='Let the rate speed up to this delay while RCDB is healthy (default: --delay, no speed-up)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Max requests in flight (default: 1)')
+    parser.add_argument('--parser', choices=sorted(RCDBScraper.PARSERS), default='soup',
+                        help='Page parser backend (default: soup)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only print the refresh queue')
+    parser.add_argument('--preview', action='store_true',
+                        help='Preview mode - fetch but do not save changes')
+    args = parser.parse_args()
+
+    if args.delay <= 0:
+        parser.error("--delay must be > 0")
+    budget = args.budget if args.budget is not None else int(args.minutes * 60 / args.delay)
+    if budget < 1:
+        parser.error("budget must allow at least one request")
+
+    database_path = Path(__file__).parent.parent.parent / "database" / "data" / "coasters_master.json"
+    # Only the fields the priorities need (selected in SQL with the SQLite backend)
+    database = query_coasters(database_path, fields=('rcdbId', 'status', 'lastScraped', 'lastChanged'))
+
+    queue = build_refresh_queue(database, budget)
+
+    status_by_id = {int(c['rcdbId']): status_name(c.get('status')) for c in database.values() if c.get('rcdbId')}
+    status_counts: Dict[str, int] = {}
+    for rcdb_id in queue:
+        status = status_by_id[rcdb_id]
+        status_counts[status] = status_counts.get(status, 0) + 1
+
+    print("=" * 70)
+    print("RCDB REFRESH SCHEDULER")
+    print("=" * 70)
+    print(f"Budget: {budget} pages")
+    print(f"Due for refresh (within budget): {len(queue)}")
+    for status, count in sorted(status_counts.items(), key=lambda item: -item[1]):
+        print(f"  {status}: {count}")
+    print("=" * 70)
+    print()
+
+    if args.dry_run:
+        for rcdb_id in queue:
+            print(f"RCDB {rcdb_id} ({status_by_id[rcdb_id]})")
+        return
+    if not queue:
+        print("✓ Nothing is due for a refresh")
+        return
+
+    update_database(
+        start_id=1,
+        end_id=None,
+        delay=args.delay,
+        min_delay=args.min_delay,
+        preview=args.preview,
+        concurrency=args.concurrency,
+        parser=args.parser,
+        rcdb_ids=queue
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+RCDB Offline Reparse
+Re-extracts coaster data from the local page cache and merges it into the database
+Makes no network calls; parsing runs in a process pool across all cores
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from database_merger_simple import DatabaseMerger
+from page_cache import DEFAULT_CACHE_DIR, PageCache
+from rcdb_scraper import PARSER_VERSION, RCDBScraper
+
+# Per-process state, set up once by _init_worker
+_worker_cache: Optional[PageCache] = None
+_worker_scraper: Optional[RCDBScraper] = None
+
+
+def _init_worker(cache_dir: str, parser: str):
+    global _worker_cache, _worker_scraper
+    _worker_cache = PageCache(cache_dir)
+    _worker_scraper = RCDBScraper(delay=0, parser=parser)
+
+
+def _parse_cached(rcdb_id: int) -> Tuple[int, Optional[Union[Dict, List[Dict]]]]:
+    """Parse one cached page in a worker; returns what fetch_coaster would have"""
+    html = _worker_cache.load_page(rcdb_id)
+    if html is None:
+        return rcdb_id, None
+    return rcdb_id, _worker_scraper.parse_page(html, rcdb_id)
+
+
+def find_stale_ids(cache: PageCache, merger: DatabaseMerger, everything: bool = False) -> List[int]:
+    """
+    Cached RCDB IDs that need reparsing
+
+    A page is redone when any database record for it was parsed by an older
+    PARSER_VERSION (or predates version tagging). Pages without a record, e.g.
+    filtered ones, are only redone with everything=True.
+    """
+    versions: Dict[str, int] = {}  # rcdb_id -> oldest parserVersion among its records
+    for coaster in merger.database.values():
+        rcdb_id = coaster.get('rcdbId')
+        if rcdb_id:
+            key = str(rcdb_id)
+            version = coaster.get('parserVersion', 0)
+            versions[key] = min(version, versions.get(key, version))
+
+    stale = []
+    for rcdb_id in cache:
+        version = versions.get(str(rcdb_id))
+        if everything or (version is not None and version < PARSER_VERSION):
+            stale.append(rcdb_id)
+    return stale
+
+
+def reparse(
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+    parser: str = 'tokenizer',
+    workers: Optional[int] = None,
+    everything: bool = False,
+    preview: bool = False,
+    batch_size: int = 1000
+):
+    """
+    Reparse cached pages and merge the results
+
+    Args:
+        cache_dir: PageCache directory filled by the updater scripts
+        parser: Page parser backend (see RCDBScraper.PARSERS)
+        workers: Worker processes (default: one per core)
+        everything: Reparse every cached page, not only outdated ones
+        preview: If True, don't save changes
+        batch_size: Results handed to merge_coasters at a time
+    """
+    workers = workers or os.cpu_count() or 1
+
+    print("=" * 70)
+    print("RCDB OFFLINE REPARSE")
+    print("=" * 70)
+    print(f"Page cache: {cache_dir}")
+    print(f"Parser: {parser} (version {PARSER_VERSION})")
+    print(f"Workers: {workers}")
+    print(f"Preview mode: {preview}")
+    print("=" * 70)
+    print()
+
+    database_dir = Path(__file__).parent.parent.parent / "database" / "data"
+    merger = DatabaseMerger(str(database_dir / "coasters_master.json"),
+                            str(database_dir / "rcdb_to_custom_mapping.json"))
+    cache = PageCache(cache_dir)
+
+    rcdb_ids = find_stale_ids(cache, merger, everything)
+    print(f"✓ {len(rcdb_ids)} of {len(cache)} cached pages to reparse")
+    if not rcdb_ids:
+        merger.close()
+        return
+
+    parsed_count = 0
+    missing_count = 0
+    filtered_count = 0
+    updated_count = 0
+    added_count = 0
+    batch: List[Dict] = []
+
+    def merge_batch():
+        nonlocal updated_count, added_count
+        stats = merger.merge_coasters(batch)
+        updated_count += stats['updated']
+        added_count += stats['added']
+        batch.clear()
+
+    # Results come back in order while workers keep parsing ahead
+    chunksize = max(1, min(64, len(rcdb_ids) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(cache_dir), parser)) as executor:
+        for i, (rcdb_id, result) in enumerate(executor.map(_parse_cached, rcdb_ids, chunksize=chunksize), 1):
+            if result is None:
+                missing_count += 1
+            elif isinstance(result, dict) and result.get('filtered'):
+                filtered_count += 1
+            elif isinstance(result, list):
+                batch.extend(result)
+                parsed_count += 1
+            else:
+                batch.append(result)
+                parsed_count += 1
+
+            if len(batch) >= batch_size:
+                merge_batch()
+            if i % 1000 == 0:
+                print(f"  {i}/{len(rcdb_ids)} pages")
+
+    if batch:
+        merge_batch()
+
+    if not preview:
+        merger.save(backup=True)
+    merger.close()
+
+    print()
+    print("=" * 70)
+    print("REPARSE COMPLETE!")
+    print("=" * 70)
+    print(f"Pages parsed: {parsed_count}")
+    print(f"Filtered (non-coasters/alpine): {filtered_count}")
+    print(f"Not found / missing from cache: {missing_count}")
+    print(f"Coasters updated: {updated_count}, added: {added_count}")
+    print("=" * 70)
+
+    if preview:
+        print()
+        print("⚠️  PREVIEW MODE - No changes were saved")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reparse cached RCDB pages without network access")
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR),
+                        help=f'Page cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--parser', choices=sorted(RCDBScraper.PARSERS), default='tokenizer',
+                        help='Page parser backend (default: tokenizer)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: one per core)')
+    parser.add_argument('--all', action='store_true',
+                        help=f'Reparse every cached page, not only those parsed before version {PARSER_VERSION}')
+    parser.add_argument('--preview', action='store_true',
+                        help='Preview mode - do not save changes')
+    args = parser.parse_args()
+
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be >= 1")
+
+    reparse(
+        cache_dir=Path(args.cache_dir),
+        parser=args.parser,
+        workers=args.workers,
+        everything=args.all,
+        preview=args.preview
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Snapshot Cache
+Shared loader for the database JSON files: keeps a marshal snapshot next to each file
+(coasters_master.json.snapshot, ...) and reads that instead of parsing the JSON
+again, as long as the file has not changed since
+"""
+
+import hashlib
+import json
+import marshal
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from coaster_record import pack_database, unpack_database
+
+# Bump when the snapshot layout changes; older snapshots are then rebuilt
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_path(path: Union[str, Path]) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + '.snapshot')
+
+
+def _file_hash(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def _read_snapshot(path: Path, stat: os.stat_result, compact: bool) -> Optional[Any]:
+    """
+    Contents from the snapshot, or None if it is missing or stale
+
+    The snapshot is current when it was taken of a file with the same size and
+    hash. The hash is only computed when the mtime differs (a checkout or copy
+    that left the content alone), so a plain start costs no read of the JSON.
+    """
+    try:
+        with open(snapshot_path(path), 'rb') as f:
+            header = marshal.load(f)
+            if header.get('version') != SNAPSHOT_VERSION or header.get('compact') != compact \
+                    or header.get('size') != stat.st_size:
+                return None
+            if header.get('mtime_ns') != stat.st_mtime_ns:
+                with open(path, 'rb') as source:
+                    if _file_hash(source.read()) != header.get('hash'):
+                        return None
+            # One read: marshal.load on a file fetches a few bytes at a time
+            data = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError, AttributeError):
+        return None
+    return unpack_database(data) if compact else data
+
+
+def write_snapshot(path: Union[str, Path], data: Any, compact: bool = False, content: Optional[bytes] = None):
+    """
+    Store data as the snapshot of the JSON file at path (which must hold it already)
+
+    content: the file's bytes, if they were read anyway (saves reading it again)
+    """
+    path = Path(path)
+    if content is None:
+        with open(path, 'rb') as f:
+            content = f.read()
+    stat = path.stat()
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'compact': compact,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': _file_hash(content),
+    }
+    target = snapshot_path(path)
+    tmp_path = target.with_name(target.name + '.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            marshal.dump(header, f)
+            marshal.dump(pack_database(data) if compact else data, f)
+        os.replace(tmp_path, target)
+    except (OSError, ValueError):
+        # Not fatal: the JSON is read again next time
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_json(path: Union[str, Path], compact: bool = False, default: Any = None) -> Any:
+    """
+    Contents of a JSON file, from its snapshot when that is current
+
+    The snapshot is rebuilt whenever the JSON had to be parsed.
+
+    Args:
+        compact: The file is a coaster database; records come back as CoasterRecords
+        default: Returned when the file does not exist (None: FileNotFoundError is raised)
+    """
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        if default is None:
+            raise
+        return default
+
+    data = _read_snapshot(path, stat, compact)
+    if data is not None:
+        return data
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    data = json.loads(content)
+    if compact:
+        data = unpack_database(pack_database(data))
+    write_snapshot(path, data, compact, content)
+    return data
+
+
+def load_database(path: Union[str, Path]) -> Dict:
+    """coasters_master.json as CoasterRecords"""
+    return load_json(path, compact=True)
@@ -0,0 +1,161 @@
+"""
+Park Spatial Index
+Fixed-size latitude/longitude grid over the located parks in parks.json, saved as
+park_grid.json, for "parks or coasters within N km" and "nearest park" queries
+"""
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from park_resolver import park_id_of
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# One-degree cells: about 111 x 70 km at 50° latitude, a few parks each
+DEFAULT_CELL_DEGREES = 1.0
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in km"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class ParkGrid:
+    """
+    parkId -> (lat, lon), bucketed into cell_degrees x cell_degrees cells
+
+    A radius query only looks at the cells overlapping the radius' bounding box,
+    so it touches a handful of parks instead of all of them.
+    """
+
+    def __init__(self, cell_degrees: float = DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.locations: Dict[str, Tuple[float, float]] = {}  # parkId -> (lat, lon)
+        self.cells: Dict[Tuple[int, int], List[str]] = {}  # (row, column) -> parkIds
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def add(self, park_id: str, latitude: float, longitude: float):
+        self.locations[park_id] = (latitude, longitude)
+        self.cells.setdefault(self._cell(latitude, longitude), []).append(park_id)
+
+    @classmethod
+    def from_parks(cls, parks: Dict[str, Dict], cell_degrees: float = DEFAULT_CELL_DEGREES) -> 'ParkGrid':
+        """Grid of every park in parks.json that has coordinates"""
+        grid = cls(cell_degrees)
+        for park_id, park in parks.items():
+            coordinates = park.get('coordinates')
+            if coordinates:
+                grid.add(park_id, coordinates['lat'], coordinates['lon'])
+        return grid
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'ParkGrid':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        grid = cls(data['cellDegrees'])
+        for park_id, (latitude, longitude) in data['parks'].items():
+            grid.add(park_id, latitude, longitude)
+        return grid
+
+    def save(self, path: Union[str, Path]):
+        """Write the grid (to a temp file first, then swapped in)"""
+        path = Path(path)
+        data = {
+            'cellDegrees': self.cell_degrees,
+            'parks': {park_id: list(location) for park_id, location in sorted(self.locations.items())},
+            'cells': {f"{row},{column}": park_ids for (row, column), park_ids in sorted(self.cells.items())},
+        }
+        tmp_path = path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def _cells_around(self, latitude: float, longitude: float, radius_km: float) -> Iterable[str]:
+        lat_span = radius_km / KM_PER_DEGREE
+        # Longitude degrees shrink towards the poles; near them, take every column
+        cos_lat = math.cos(math.radians(min(89.0, abs(latitude) + lat_span)))
+        lon_span = radius_km / (KM_PER_DEGREE * cos_lat)
+        first_row, first_column = self._cell(latitude - lat_span, longitude - lon_span)
+        last_row, last_column = self._cell(latitude + lat_span, longitude + lon_span)
+        columns_around = round(360 / self.cell_degrees)
+        if last_column - first_column + 1 >= columns_around:
+            first_column, last_column = self._cell(0, -180)[1], self._cell(0, 180)[1]
+
+        seen = set()
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                # Wrap around the antimeridian
+                wrapped = (column + columns_around // 2) % columns_around - columns_around // 2
+                if (row, wrapped) not in seen:
+                    seen.add((row, wrapped))
+                    yield from self.cells.get((row, wrapped), ())
+
+    def within(self, latitude: float, longitude: float, radius_km: float,
+               keep: Optional[Callable[[str], bool]] = None) -> List[Tuple[float, str]]:
+        """(distance in km, parkId) of the parks within radius_km, nearest first"""
+        found = []
+        for park_id in self._cells_around(latitude, longitude, radius_km):
+            if keep is not None and not keep(park_id):
+                continue
+            distance = haversine_km(latitude, longitude, *self.locations[park_id])
+            if distance <= radius_km:
+                found.append((distance, park_id))
+        found.sort()
+        return found
+
+    def nearest(self, latitude: float, longitude: float, count: int = 1,
+                keep: Optional[Callable[[str], bool]] = None) -> List[Tuple[float, str]]:
+        """The count nearest parks (passing keep), nearest first; widens the search until found"""
+        radius_km = 50.0
+        while True:
+            found = self.within(latitude, longitude, radius_km, keep)
+            if len(found) >= count or radius_km > 2 * math.pi * EARTH_RADIUS_KM:
+                return found[:count]
+            radius_km *= 2
+
+
+class CoasterLocator:
+    """Coaster queries on top of a ParkGrid, through the parkId inside each custom ID"""
+
+    def __init__(self, grid: ParkGrid, coaster_ids: Iterable[str]):
+        self.grid = grid
+        self.by_park: Dict[str, List[str]] = {}  # parkId -> custom coaster IDs
+        for custom_id in coaster_ids:
+            park_id = park_id_of(custom_id)
+            if park_id:
+                self.by_park.setdefault(park_id, []).append(custom_id)
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[float, str]]:
+        """(distance in km, custom ID) of the coasters within radius_km, nearest first"""
+        return [
+            (distance, custom_id)
+            for distance, park_id in self.grid.within(latitude, longitude, radius_km, self.by_park.__contains__)
+            for custom_id in self.by_park[park_id]
+        ]
+
+    def nearest_unridden(self, latitude: float, longitude: float, ridden: Iterable[str],
+                         count: int = 10) -> List[Tuple[float, str]]:
+        """(distance in km, custom ID) of the nearest coasters not in ridden"""
+        ridden = set(ridden)
+
+        def has_new(park_id: str) -> bool:
+            return any(custom_id not in ridden for custom_id in self.by_park.get(park_id, ()))
+
+        found = []
+        # Every park found holds at least one unridden coaster, so count parks suffice
+        for distance, park_id in self.grid.nearest(latitude, longitude, count, has_new):
+            found.extend((distance, custom_id) for custom_id in self.by_park[park_id]
+                         if custom_id not in ridden)
+        return found[:count]
@@ -0,0 +1,32 @@
+"""
+Parser backend regression check (run with: python -m pytest test_parser_backends.py)
+Every page parser in RCDBScraper.PARSERS must give the same parse_page output as
+the 'soup' reference on the pages in fixtures/rcdb_pages: single-track and split
+coasters, filtered pages (park, person, alpine) and a page with malformed markup.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from rcdb_scraper import RCDBScraper
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "rcdb_pages"
+PAGES = sorted(FIXTURES_DIR.glob('*.htm'))
+REFERENCE = 'soup'
+
+
+@pytest.mark.parametrize('parser', [name for name in RCDBScraper.PARSERS if name != REFERENCE])
+@pytest.mark.parametrize('path', PAGES, ids=[path.stem for path in PAGES])
+def test_parse_page_matches_reference(path: Path, parser: str):
+    html = path.read_text(encoding='utf-8')
+    expected = RCDBScraper(delay=0, parser=REFERENCE).parse_page(html, 1)
+    assert RCDBScraper(delay=0, parser=parser).parse_page(html, 1) == expected
+
+
+def test_fixtures_cover_both_page_kinds():
+    results = [RCDBScraper(delay=0, parser=REFERENCE).parse_page(path.read_text(encoding='utf-8'), 1)
+               for path in PAGES]
+    assert any(isinstance(result, list) for result in results), "no split coaster page"
+    assert any(isinstance(result, dict) and not result.get('filtered') for result in results), "no coaster page"
+    assert any(isinstance(result, dict) and result.get('filtered') for result in results), "no filtered page"
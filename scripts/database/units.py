@@ -0,0 +1,130 @@
+"""
+Stat Units
+Turns scraped stat strings ("213", "74", "2:30") into numbers in canonical units:
+metres for height/drop/length, km/h for speed, seconds for duration
+"""
+
+import re
+from typing import Dict, Optional, Union
+
+# RCDB shows imperial units unless the visitor picked metric in its settings
+DEFAULT_UNITS = 'imperial'
+
+LENGTH_FIELDS = ('height', 'drop', 'length')  # -> metres
+SPEED_FIELDS = ('speed',)  # -> km/h
+ANGLE_FIELDS = ('angle', 'verticalAngle')  # degrees either way
+
+METRES_PER_UNIT = {'imperial': 0.3048, 'metric': 1.0}
+KMH_PER_UNIT = {'imperial': 1.609344, 'metric': 1.0}
+DEGREES_PER_UNIT = {'imperial': 1.0, 'metric': 1.0}
+
+# Decimals kept after conversion (RCDB's metric pages show one)
+DECIMALS = 1
+
+# First value with a unit on the page, e.g. <span class=float>213</span> ft
+_UNIT_RE = re.compile(r'<span class=float>[^<]*</span>\s*(ft|mph|km/h|m)\b', re.IGNORECASE)
+
+# A stored string that names its own unit, e.g. "64.9 m" or "213 ft"
+_VALUE_UNIT_RE = re.compile(r'^\s*([\d,.]+)\s*(ft|mph|km/h|m)\s*$', re.IGNORECASE)
+
+Number = Union[int, float]
+
+
+def detect_units(html: str) -> str:
+    """'imperial' or 'metric', from the first unit on an RCDB page"""
+    match = _UNIT_RE.search(html)
+    if not match:
+        return DEFAULT_UNITS
+    return 'imperial' if match.group(1).lower() in ('ft', 'mph') else 'metric'
+
+
+def to_number(value) -> Optional[float]:
+    """Float of a scraped value ("1,234.5" included), None when empty or not a number"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(',', '').strip())
+    except ValueError:
+        return None
+
+
+def parse_duration(value) -> Optional[int]:
+    """Seconds of an "m:ss" (or "h:mm:ss") duration; numbers are taken as seconds already"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    parts = str(value or '').strip().split(':')
+    if not all(part.isdigit() for part in parts):
+        return None
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def _convert(value, factors: Dict[str, float], units: str) -> Optional[Number]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value  # Already canonical
+    match = _VALUE_UNIT_RE.match(str(value or ''))
+    if match:
+        # The unit on the value beats the assumed one
+        value = match.group(1)
+        units = 'imperial' if match.group(2).lower() in ('ft', 'mph') else 'metric'
+    number = to_number(value)
+    return round(number * factors[units], DECIMALS) if number is not None else None
+
+
+def normalize_stats(record: Dict, units: str = DEFAULT_UNITS) -> Dict:
+    """
+    Convert the stat fields of a record in place and set "sourceUnits"
+
+    String values are read in the given units; values that are numbers already
+    are kept, so normalizing a record twice changes nothing. Fields without a
+    usable value become None.
+    """
+    for field_name in LENGTH_FIELDS:
+        if field_name in record:
+            record[field_name] = _convert(record[field_name], METRES_PER_UNIT, units)
+    for field_name in SPEED_FIELDS:
+        if field_name in record:
+            record[field_name] = _convert(record[field_name], KMH_PER_UNIT, units)
+    for field_name in ANGLE_FIELDS:
+        if field_name in record:
+            record[field_name] = _convert(record[field_name], DEGREES_PER_UNIT, units)
+    if 'inversions' in record:
+        inversions = to_number(record['inversions'])
+        record['inversions'] = int(inversions) if inversions is not None else None
+    if 'duration' in record:
+        record['duration'] = parse_duration(record['duration'])
+    record['sourceUnits'] = units
+    return record
+
+
+def needs_migration(record: Dict) -> bool:
+    """
+    True for a record that predates typed stats: no "sourceUnits" yet and at
+    least one stat still a string. Records whose stats are all numbers (or
+    empty) are in canonical units already and must not be converted again.
+    """
+    if 'sourceUnits' in record:
+        return False
+    fields = LENGTH_FIELDS + SPEED_FIELDS + ANGLE_FIELDS + ('inversions', 'duration')
+    return any(isinstance(record.get(field_name), str) and record[field_name].strip()
+               for field_name in fields)
+
+
+def migrate_database(database: Dict[str, Dict], assume_units: str = DEFAULT_UNITS) -> int:
+    """
+    Normalize every record that predates typed stats (see needs_migration)
+
+    Their string values were mostly scraped without a unit, so they are read
+    in assume_units unless the value names its unit ("64.9 m"). Returns the
+    number of records converted.
+    """
+    migrated = 0
+    for coaster in database.values():
+        if needs_migration(coaster):
+            normalize_stats(coaster, assume_units)
+            migrated += 1
+    return migrated
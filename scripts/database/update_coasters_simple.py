@@ -5,11 +5,18 @@ Main script for updating coaster database from RCDB
 
 import json
 import argparse
-import time
+import sys
+from collections import Counter
 from pathlib import Path
-from typing import List, Dict
-from rcdb_scraper import RCDBScraper
+from typing import List, Dict, Optional
+from rcdb_scraper import AsyncRCDBScraper, RCDBScraper, RCDBUnavailableError
+from rcdb_discovery import CoasterDiscovery, DiscoveryError
 from database_merger_simple import DatabaseMerger
+from negative_cache import NOT_FOUND_REASON, NegativeCache
+from page_cache import DEFAULT_CACHE_DIR, PageCache
+
+# Counts of a merge_page result that are summed per batch
+MERGE_COUNTS = ('updated', 'unchanged', 'added', 'preserved_split')
 
 
 class ProgressTracker:
@@ -41,6 +48,8 @@ class ProgressTracker:
         """Mark RCDB ID as completed"""
         if rcdb_id not in self.completed:
             self.completed.append(rcdb_id)
+        if rcdb_id in self.failed:
+            self.failed.remove(rcdb_id)
     
     def mark_failed(self, rcdb_id: int):
         """Mark RCDB ID as failed"""
@@ -54,31 +63,66 @@ class ProgressTracker:
 
 def update_database(
     start_id: int,
-    end_id: int,
+    end_id: Optional[int],
     delay: float = 3.0,
+    min_delay: Optional[float] = None,
     preview: bool = False,
     resume: bool = False,
-    save_interval: int = 500
-):
+    save_interval: int = 500,
+    concurrency: int = 1,
+    parser: str = 'soup',
+    use_cache: bool = True,
+    reparse: bool = False,
+    negative_ttl: float = 30,
+    missing_ttl: float = 7,
+    discover: bool = False,
+    rcdb_ids: Optional[List[int]] = None
+) -> bool:
     """
     Update database from RCDB
     
     Args:
         start_id: First RCDB ID to scrape
-        end_id: Last RCDB ID to scrape (inclusive)
-        delay: Delay between requests in seconds
+        end_id: Last RCDB ID to scrape (inclusive); None = up to the end found by discovery
+        delay: Starting delay between requests in seconds
+        min_delay: Shortest delay the scraper may speed up to while RCDB responds
+            healthily; it slows down again on 429/5xx/timeouts. None = delay (never
+            faster than the starting delay)
         preview: If True, don't save changes
         resume: If True, skip already completed IDs
         save_interval: Save database every N coasters
+        concurrency: Max requests in flight (1 = sequential). Requests still start
+            at most one per `min_delay` seconds (one per `delay` by default).
+        parser: Page parser backend ('soup' or 'tokenizer', see RCDBScraper.PARSERS)
+        use_cache: Keep pages in the local page cache and fetch them with conditional GETs
+        reparse: Parse and merge pages even when they are unchanged since the last run
+        negative_ttl: Days to skip IDs that were filtered out (0 = never skip)
+        missing_ttl: Days to skip IDs that did not exist (0 = never skip)
+        discover: Only fetch coaster IDs found on RCDB's listing pages (see
+            rcdb_discovery) instead of every ID in the range
+        rcdb_ids: Explicit IDs to fetch, in this order (e.g. a refresh_scheduler
+            queue); overrides the range and discovery
+    
+    Returns:
+        False if the run could not start (discovery failed), else True
     """
     
     print("=" * 70)
     print("RCDB DATABASE UPDATER")
     print("=" * 70)
-    print(f"Range: RCDB {start_id} to {end_id}")
-    print(f"Delay: {delay} seconds")
+    if rcdb_ids is not None:
+        print(f"IDs: {len(rcdb_ids)} given")
+    else:
+        print(f"Range: RCDB {start_id} to {end_id or 'end'}")
+        print(f"Discovery: {discover}")
+    if min_delay is None or min_delay >= delay:
+        print(f"Delay: {delay} seconds (slows down on errors)")
+    else:
+        print(f"Delay: {delay} seconds (adaptive, down to {min_delay})")
     print(f"Preview mode: {preview}")
     print(f"Resume mode: {resume}")
+    print(f"Concurrency: {concurrency}")
+    print(f"Page cache: {DEFAULT_CACHE_DIR if use_cache else 'disabled'}")
     print("=" * 70)
     print()
     
@@ -89,7 +133,14 @@ def update_database(
     mapping_path = database_dir / "rcdb_to_custom_mapping.json"
     
     # Initialize
-    scraper = RCDBScraper(delay=delay)
+    cache = PageCache() if use_cache else None
+    negatives = NegativeCache(ttl_days=negative_ttl, missing_ttl_days=missing_ttl)
+    if concurrency > 1:
+        scraper = AsyncRCDBScraper(delay=delay, min_delay=min_delay, max_in_flight=concurrency,
+                                   parser=parser, cache=cache, skip_unchanged=not reparse)
+    else:
+        scraper = RCDBScraper(delay=delay, min_delay=min_delay, parser=parser,
+                              cache=cache, skip_unchanged=not reparse)
     merger = DatabaseMerger(str(database_path), str(mapping_path))
     progress = ProgressTracker()
     
@@ -97,31 +148,77 @@ def update_database(
     scraped_count = 0
     not_found_count = 0
     filtered_count = 0
+    unchanged_count = 0
+    error_count = 0
     split_count = 0
     total_coasters = 0
-    scraped_batch = []
+    batch_stats = Counter()  # Merge results since the last save
+    pending = 0  # Coasters merged (or marked unchanged) since the last save
     consecutive_not_found = 0
     max_consecutive_not_found = 150  # Stop after 150 consecutive not founds
     
-    # Process range
-    total_ids = end_id - start_id + 1
+    # Candidate IDs: given explicitly, discovered coasters, or the whole range
+    if rcdb_ids is not None:
+        candidate_ids = list(rcdb_ids)
+    elif discover:
+        try:
+            discovered = CoasterDiscovery(scraper).candidate_ids()
+        except (DiscoveryError, RCDBUnavailableError) as e:
+            print(f"⚠️  Discovery failed: {e}")
+            print("   Nothing was fetched; run again later")
+            merger.close()
+            return False
+        candidate_ids = [
+            rcdb_id for rcdb_id in discovered
+            if rcdb_id >= start_id and (end_id is None or rcdb_id <= end_id)
+        ]
+        print()
+    else:
+        candidate_ids = range(start_id, end_id + 1)
+    total_ids = len(candidate_ids)
+    position = {rcdb_id: i for i, rcdb_id in enumerate(candidate_ids, 1)}
     
-    for i, rcdb_id in enumerate(range(start_id, end_id + 1), 1):
-        # Skip if already completed (resume mode)
-        if resume and progress.is_completed(rcdb_id):
-            print(f"[{i}/{total_ids}] RCDB {rcdb_id}: SKIPPED (already completed)")
-            continue
-        
-        # Scrape coaster
-        print(f"[{i}/{total_ids}] RCDB {rcdb_id}: Scraping...", end=" ", flush=True)
+    def ids_to_scrape():
+        for i, rcdb_id in enumerate(candidate_ids, 1):
+            # Skip if already completed (resume mode)
+            if resume and progress.is_completed(rcdb_id):
+                print(f"[{i}/{total_ids}] RCDB {rcdb_id}: SKIPPED (already completed)")
+                continue
+            # Skip IDs recently seen as non-coaster or missing
+            if negatives.should_skip(rcdb_id):
+                print(f"[{i}/{total_ids}] RCDB {rcdb_id}: SKIPPED ({negatives.get(rcdb_id)['reason']})")
+                continue
+            yield rcdb_id
+    
+    def fetch_all():
+        if isinstance(scraper, AsyncRCDBScraper):
+            # Results arrive in completion order, not strictly by ID
+            results = scraper.iter_many(ids_to_scrape())
+        else:
+            results = ((rcdb_id, scraper.fetch_coaster(rcdb_id)) for rcdb_id in ids_to_scrape())
+        try:
+            yield from results
+        except RCDBUnavailableError as e:
+            # End the run normally so everything scraped so far is still saved
+            print()
+            print(f"⚠️  Stopping: {e}")
+    
+    results = fetch_all()
+    
+    for rcdb_id, result in results:
+        # Report result
+        print(f"[{position[rcdb_id]}/{total_ids}] RCDB {rcdb_id}:", end=" ", flush=True)
         
-        result = scraper.fetch_coaster(rcdb_id)
+        # Whatever the outcome, it is handled (and merged) below
+        if cache is not None:
+            cache.commit(rcdb_id)
         
         # Check if not found
         if result is None:
             print("NOT FOUND")
             consecutive_not_found += 1
             not_found_count += 1
+            negatives.record(rcdb_id, NOT_FOUND_REASON)
             progress.mark_completed(rcdb_id)
             
             # Stop if too many consecutive not founds
@@ -132,11 +229,31 @@ def update_database(
                 break
             continue
         
+        # Check if the download failed (retried already); leave it for a later run
+        if isinstance(result, dict) and result.get('error'):
+            print(f"ERROR - {result.get('reason', 'Unknown')}")
+            error_count += 1
+            progress.mark_failed(rcdb_id)
+            continue
+        
         # Check if filtered
         if isinstance(result, dict) and result.get('filtered'):
             print(f"FILTERED - {result.get('reason', 'Unknown')}")
             consecutive_not_found = 0  # Reset counter
             filtered_count += 1
+            negatives.record(rcdb_id, result.get('reason', 'Unknown'), result.get('classification', ''))
+            progress.mark_completed(rcdb_id)
+            continue
+        
+        # Check if unchanged since the cached copy (nothing to parse or merge)
+        if isinstance(result, dict) and result.get('unchanged'):
+            print("UNCHANGED")
+            consecutive_not_found = 0  # Reset counter
+            unchanged_count += 1
+            merger.mark_unchanged([rcdb_id])
+            pending += 1
+            # Same page, same outcome: keeps a filtered ID's negative entry fresh
+            negatives.touch(rcdb_id)
             progress.mark_completed(rcdb_id)
             continue
         
@@ -144,53 +261,63 @@ def update_database(
         if isinstance(result, list):
             # Split coaster
             print(f"✓ SPLIT ({len(result)} tracks)")
-            for coaster in result:
-                scraped_batch.append(coaster)
+            tracks = result
             split_count += 1
-            total_coasters += len(result)
         else:
             # Single coaster
             print(f"✓ {result.get('name', 'Unknown')}")
-            scraped_batch.append(result)
-            total_coasters += 1
+            tracks = [result]
+        total_coasters += len(tracks)
+        
+        # Merge right away, so nothing piles up between saves
+        page = merger.merge_page(tracks)
+        batch_stats.update({key: int(page[key]) for key in MERGE_COUNTS})
+        pending += len(tracks)
         
         consecutive_not_found = 0  # Reset counter on successful scrape
+        negatives.forget(rcdb_id)
         scraped_count += 1
         progress.mark_completed(rcdb_id)
         
-        # Take a break every 100 attempts
-        if i % 100 == 0:
-            print()
-            print(f"--- Taking 10 second break after {i} attempts ---")
-            time.sleep(10)
-            print()
-        
         # Save periodically
-        if len(scraped_batch) >= save_interval:
+        if pending >= save_interval:
             print()
-            print(f"--- Saving batch of {len(scraped_batch)} coasters ---")
-            stats = merger.merge_coasters(scraped_batch)
+            print(f"--- Saving batch of {pending} coasters ---")
             
             if not preview:
-                merger.save(backup=True)
+                # Only the changed records go to the journal; the final save compacts
+                merger.save(backup=False, compact=False)
                 progress.save()
+                negatives.save()
+                if cache is not None:
+                    cache.save()
             
-            print(f"Updated: {stats['updated']}, Added: {stats['added']}, Preserved splits: {stats['preserved_splits']}")
+            print(f"Updated: {batch_stats['updated']}, Unchanged: {batch_stats['unchanged']}, Added: {batch_stats['added']}, Preserved splits: {batch_stats['preserved_split']}")
             print()
             
-            scraped_batch = []
+            batch_stats = Counter()
+            pending = 0
+    
+    # Stop any fetches still in flight (e.g. after the consecutive-not-found cutoff)
+    results.close()
     
-    # Final save
-    if scraped_batch:
+    # Final save: folds the periodic saves (journal or SQLite) into coasters_master.json
+    if pending or merger.export_pending():
         print()
-        print(f"--- Final save: {len(scraped_batch)} coasters ---")
-        stats = merger.merge_coasters(scraped_batch)
+        print(f"--- Final save: {pending} coasters ---")
         
         if not preview:
             merger.save(backup=True)
             progress.save()
         
-        print(f"Updated: {stats['updated']}, Added: {stats['added']}, Preserved splits: {stats['preserved_splits']}")
+        print(f"Updated: {batch_stats['updated']}, Unchanged: {batch_stats['unchanged']}, Added: {batch_stats['added']}, Preserved splits: {batch_stats['preserved_split']}")
+    
+    # Everything fetched has been merged now, so the cache index can be written
+    if not preview:
+        negatives.save()
+        if cache is not None:
+            cache.save()
+    merger.close()
     
     # Summary
     print()
@@ -200,6 +327,9 @@ def update_database(
     print(f"RCDB IDs processed: {scraped_count}")
     print(f"Filtered (non-coasters/alpine): {filtered_count}")
     print(f"Not found: {not_found_count}")
+    print(f"Unchanged (cached): {unchanged_count}")
+    print(f"Errors (retry with --resume): {error_count}")
+    print(f"Skipped known non-coasters/missing: {negatives.skipped} (requests saved)")
     print(f"Split coasters: {split_count}")
     print(f"Total coasters added: {total_coasters}")
     print(f"Database size: {len(merger.database)} coasters")
@@ -209,6 +339,7 @@ def update_database(
         print()
         print("⚠️  PREVIEW MODE - No changes were saved")
         print("Run without --preview to save changes")
+    return True
 
 
 def main():
@@ -228,42 +359,84 @@ Examples:
   
   # Resume after interruption
   python update_coasters.py --start 1 --end 1000 --resume
+  
+  # Keep 4 requests in flight (still at most one request per --delay seconds)
+  python update_coasters.py --start 1 --end 1000 --concurrency 4
+  
+  # Only fetch coasters listed on RCDB (no blind sweep of the ID range)
+  python update_coasters.py --discover
+  
+  # Re-parse and merge every page, even ones unchanged since the last run
+  python update_coasters.py --start 1 --end 1000 --reparse
         """
     )
     
-    parser.add_argument('--start', type=int, required=True,
-                        help='First RCDB ID to scrape')
-    parser.add_argument('--end', type=int, required=True,
-                        help='Last RCDB ID to scrape (inclusive)')
+    parser.add_argument('--start', type=int, default=1,
+                        help='First RCDB ID to scrape (default: 1)')
+    parser.add_argument('--end', type=int, default=None,
+                        help='Last RCDB ID to scrape (inclusive); optional with --discover')
+    parser.add_argument('--discover', action='store_true',
+                        help="Only fetch coaster IDs found on RCDB's listing pages")
     parser.add_argument('--delay', type=float, default=3.0,
-                        help='Delay between requests in seconds (default: 3.0)')
+                        help='Starting delay between requests in seconds (default: 3.0)')
+    parser.add_argument('--min-delay', type=float, default=None,
+                        help='Let the rate speed up to this delay while RCDB is healthy (default: --delay, no speed-up)')
     parser.add_argument('--preview', action='store_true',
                         help='Preview mode - do not save changes')
     parser.add_argument('--resume', action='store_true',
                         help='Resume mode - skip already completed IDs')
     parser.add_argument('--save-interval', type=int, default=500,
                         help='Save database every N coasters (default: 500)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Max requests in flight; requests still start at most one per --delay, '
+                             'or --min-delay if given (default: 1)')
+    parser.add_argument('--parser', choices=sorted(RCDBScraper.PARSERS), default='soup',
+                        help='Page parser backend (default: soup)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not use the local page cache (always download and parse)')
+    parser.add_argument('--reparse', action='store_true',
+                        help='Parse and merge pages even when unchanged since the last run')
+    parser.add_argument('--negative-ttl', type=float, default=30,
+                        help='Days to skip IDs that were filtered out, 0 to never skip (default: 30)')
+    parser.add_argument('--missing-ttl', type=float, default=7,
+                        help='Days to skip IDs that did not exist, 0 to never skip (default: 7)')
     
     args = parser.parse_args()
     
     # Validate
     if args.start < 1:
         parser.error("--start must be >= 1")
-    if args.end < args.start:
+    if args.end is None and not args.discover:
+        parser.error("--end is required unless --discover is used")
+    if args.end is not None and args.end < args.start:
         parser.error("--end must be >= --start")
     if args.delay < 0:
         parser.error("--delay must be >= 0")
+    if args.min_delay is not None and args.min_delay < 0:
+        parser.error("--min-delay must be >= 0")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be >= 1")
     
     # Run update
     try:
-        update_database(
+        completed = update_database(
             start_id=args.start,
             end_id=args.end,
             delay=args.delay,
+            min_delay=args.min_delay,
             preview=args.preview,
             resume=args.resume,
-            save_interval=args.save_interval
+            save_interval=args.save_interval,
+            concurrency=args.concurrency,
+            parser=args.parser,
+            use_cache=not args.no_cache,
+            reparse=args.reparse,
+            negative_ttl=args.negative_ttl,
+            missing_ttl=args.missing_ttl,
+            discover=args.discover
         )
+        if not completed:
+            sys.exit(1)
     except KeyboardInterrupt:
         print()
         print()
@@ -2,89 +2,111 @@
 Update only SBNO coasters from RCDB
 """
 
-import json
-import time
-from rcdb_scraper import RCDBScraper
-from database_merger_simple import DatabaseMerger
+from rcdb_scraper import RCDBScraper, RCDBUnavailableError
+from database_merger_simple import DatabaseMerger, query_coasters
+from page_cache import PageCache
 
-# Load current SBNO coasters
-with open('../../database/data/coasters_master.json', 'r', encoding='utf-8') as f:
-    coasters_dict = json.load(f)
+# Load current SBNO coasters (only those are read)
+coasters_dict = query_coasters('../../database/data/coasters_master.json', status='SBNO')
 
-coasters = list(coasters_dict.values())
-sbno_coasters = [c for c in coasters if c.get('status') == 'SBNO']
+sbno_coasters = list(coasters_dict.values())
 sbno_rcdb_ids = sorted([int(c['rcdbId']) for c in sbno_coasters if c.get('rcdbId')])
 
 print(f"Found {len(sbno_rcdb_ids)} SBNO coasters to re-scrape")
 
 # Initialize scraper and merger
-scraper = RCDBScraper()
+cache = PageCache()
+scraper = RCDBScraper(cache=cache)
 merger = DatabaseMerger(
     database_path='../../database/data/coasters_master.json',
     mapping_path='../../database/data/rcdb_to_custom_mapping.json'
 )
 
+# Merged pages between saves, so a crash loses at most this many
+SAVE_INTERVAL = 50
+
 # Re-scrape each SBNO coaster
 successful = 0
 failed = 0
+unchanged = 0
 status_changes = []
-all_scraped_coasters = []
 
-for i, rcdb_id in enumerate(sbno_rcdb_ids, 1):
-    print(f"[{i}/{len(sbno_rcdb_ids)}] RCDB {rcdb_id}: ", end='', flush=True)
-    
-    try:
-        # Scrape the coaster
-        coaster_data = scraper.fetch_coaster(rcdb_id)
+
+def scraped_pages():
+    """Scrape the SBNO coasters one by one, yielding each page's coaster(s) to merge"""
+    global successful, failed, unchanged
+    for i, rcdb_id in enumerate(sbno_rcdb_ids, 1):
+        print(f"[{i}/{len(sbno_rcdb_ids)}] RCDB {rcdb_id}: ", end='', flush=True)
         
-        if coaster_data and not isinstance(coaster_data, list) and not coaster_data.get('filtered'):
-            # Single coaster
-            old_status = None
-            custom_id = merger.mapping.get(str(rcdb_id))
-            if custom_id and custom_id in merger.database:
-                old_status = merger.database[custom_id].get('status')
+        try:
+            # Scrape the coaster
+            coaster_data = scraper.fetch_coaster(rcdb_id)
+            cache.commit(rcdb_id)
             
-            new_status = coaster_data.get('status', 'Operating')
-            print(f"✓ {coaster_data.get('name', 'unknown')} - Status: {old_status} → {new_status}")
+            if isinstance(coaster_data, dict) and coaster_data.get('unchanged'):
+                # Same page as last time, so the status cannot have changed
+                print("= Unchanged")
+                merger.mark_unchanged([rcdb_id])
+                unchanged += 1
+            elif isinstance(coaster_data, dict) and coaster_data.get('error'):
+                print(f"✗ Error: {coaster_data.get('reason')}")
+                failed += 1
+            elif coaster_data and not isinstance(coaster_data, list) and not coaster_data.get('filtered'):
+                # Single coaster
+                old_status = None
+                custom_id = merger.mapping.get(str(rcdb_id))
+                if custom_id and custom_id in merger.database:
+                    old_status = merger.database[custom_id].get('status')
+                
+                new_status = coaster_data.get('status', 'Operating')
+                print(f"✓ {coaster_data.get('name', 'unknown')} - Status: {old_status} → {new_status}")
+                
+                if old_status != new_status:
+                    status_changes.append({
+                        'rcdb_id': rcdb_id,
+                        'name': coaster_data.get('name'),
+                        'old': old_status,
+                        'new': new_status
+                    })
+                
+                successful += 1
+                yield [coaster_data]
+            elif isinstance(coaster_data, list):
+                # Split coaster
+                print(f"✓ Split coaster ({len(coaster_data)} tracks)")
+                successful += 1
+                yield coaster_data
+            else:
+                print("✗ Not found or filtered")
+                failed += 1
             
-            if old_status != new_status:
-                status_changes.append({
-                    'rcdb_id': rcdb_id,
-                    'name': coaster_data.get('name'),
-                    'old': old_status,
-                    'new': new_status
-                })
-            
-            all_scraped_coasters.append(coaster_data)
-            successful += 1
-        elif isinstance(coaster_data, list):
-            # Split coaster
-            print(f"✓ Split coaster ({len(coaster_data)} tracks)")
-            all_scraped_coasters.extend(coaster_data)
-            successful += 1
-        else:
-            print("✗ Not found or filtered")
+        except RCDBUnavailableError as e:
+            # Stop scraping; everything merged so far is still saved
+            print(f"✗ {e}")
             failed += 1
-        
-        # Delay between requests
-        time.sleep(1.5)
-        
-    except Exception as e:
-        print(f"✗ Error: {e}")
-        failed += 1
+            return
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            failed += 1
+
 
-# Merge all scraped coasters into database
-print("\nMerging all scraped coasters into database...")
-merge_result = merger.merge_coasters(all_scraped_coasters)
+# Merge each page as soon as it is scraped, saving every SAVE_INTERVAL pages
+for merged, _ in enumerate(merger.merge_stream(scraped_pages()), 1):
+    if merged % SAVE_INTERVAL == 0:
+        merger.save(backup=False, compact=False)
+        cache.save()
 
 # Save final database
 print("\nSaving database...")
 merger.save()
+merger.close()
+cache.save()
 
 print("\n" + "="*70)
 print("UPDATE COMPLETE!")
 print("="*70)
 print(f"Successful: {successful}")
+print(f"Unchanged: {unchanged}")
 print(f"Failed: {failed}")
 print(f"Status changes: {len(status_changes)}")
 
@@ -2,18 +2,25 @@
 Comprehensive validation script for the cleaned coasters database.
 """
 
-import json
 import random
 from collections import Counter, defaultdict
 from pathlib import Path
 
+from database_merger_simple import query_coasters
+from park_resolver import park_id_of
+from snapshot_cache import load_json
+
 # Define the path to the database
 DATABASE_PATH = Path(__file__).parent.parent.parent.parent / "database" / "data" / "coasters_master.json"
+PARKS_PATH = DATABASE_PATH.parent / "parks.json"
 
 def load_database():
-    """Load the coasters database."""
-    with open(DATABASE_PATH, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    """Load the coasters database (from coasters_master.sqlite when in use)."""
+    return query_coasters(DATABASE_PATH)
+
+def load_parks():
+    """Load parks.json (empty if missing)."""
+    return load_json(PARKS_PATH, default={})
 
 def check_empty_types(data):
     """Check for entries with empty 'type' field."""
@@ -106,6 +113,19 @@ def check_duplicate_ids(data):
     duplicates = [id for id, count in Counter(ids).items() if count > 1]
     return duplicates
 
+def check_parks_needing_review(parks):
+    """Check for parks added automatically by the scraper and not reviewed yet."""
+    issues = []
+    for park_id, park in parks.items():
+        if park.get('needsReview'):
+            issues.append({
+                'rcdb_id': park.get('rcdbParkId', 'N/A'),
+                'name': park.get('name', 'N/A'),
+                'issue': f"New park {park_id} ({park.get('country', 'N/A')}): check it is not a duplicate, "
+                         f"then remove needsReview from parks.json"
+            })
+    return issues
+
 def sample_random_entries(data, sample_size=25):
     """Sample random entries from the database."""
     all_ids = list(data.keys())
@@ -126,8 +146,9 @@ def sample_random_entries(data, sample_size=25):
     
     return samples
 
-def analyze_database_stats(data):
-    """Analyze database statistics."""
+def analyze_database_stats(data, parks=None):
+    """Analyze database statistics. Coasters count as located if their park is."""
+    parks = parks or {}
     stats = {
         'total_entries': len(data),
         'steel_count': 0,
@@ -168,7 +189,8 @@ def analyze_database_stats(data):
         stats['countries'][country] += 1
         
         # Data completeness
-        if coaster.get('coordinates'):
+        park = parks.get(park_id_of(rcdb_id) or '', {})
+        if coaster.get('coordinates') or park.get('coordinates'):
             stats['with_coordinates'] += 1
         if coaster.get('speed'):
             stats['with_speed'] += 1
@@ -304,6 +326,7 @@ def main():
     print(f"Loaded {len(data)} entries")
     print()
     
+    parks = load_parks()
     print("Running validation checks...")
     
     # Run all checks
@@ -311,12 +334,13 @@ def main():
         'Empty Type Field': check_empty_types(data),
         'Alpine/Mountain Coasters': check_alpine_coasters(data),
         'Suspicious Manufacturers': check_suspicious_manufacturers(data),
-        'Suspicious Patterns': check_suspicious_patterns(data)
+        'Suspicious Patterns': check_suspicious_patterns(data),
+        'Parks Needing Review': check_parks_needing_review(parks)
     }
     
     duplicates = check_duplicate_ids(data)
     samples = sample_random_entries(data, 25)
-    stats = analyze_database_stats(data)
+    stats = analyze_database_stats(data, parks)
     
     # Print comprehensive report
     print_report(data, issues_by_category, duplicates, samples, stats)